@@ -1,39 +1,113 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g, Response, abort
+import hmac
+import time
 import pickle
-import pandas as pd
-import numpy as np
+import hashlib
+import threading
 import os
-from alibi_detect.cd import KSDrift
-from sklearn.preprocessing import StandardScaler
-from src.feature_store import FeatureStore
 from src.logger import get_logger
+from src.profiling import RequestProfiler
+from src.memory_metrics import record_artifacts
+from src.tracing import configure_tracing, traced, span, set_span_attributes, start_server_span, end_server_span
 from prometheus_client import start_http_server, Counter, Gauge
 
 logger = get_logger(__name__)
 
+configure_tracing("titanic-app")
+
 app = Flask(__name__)
 
+@app.before_request
+def start_request_span():
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    g.trace_span = start_server_span(f"{request.method} {rule}", request.headers,
+                                     {"http.request.method": request.method, "http.route": rule})
+
+@app.after_request
+def record_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def end_request_span(exc):
+    handle = g.pop('trace_span', None)
+    if handle is not None:
+        end_server_span(handle, status_code=g.pop('response_status', None), error=exc)
+
+# Profiling endpoints are only served when an admin token is configured.
+PROFILER_ADMIN_TOKEN = os.getenv("PROFILER_ADMIN_TOKEN")
+profiler = RequestProfiler()
+
+@app.before_request
+def start_request_profile():
+    if profiler.active and not request.path.startswith('/admin/'):
+        g.profile_token = profiler.begin_request()
+
+@app.teardown_request
+def stop_request_profile(exc):
+    token = g.pop('profile_token', None)
+    if token is not None:
+        profiler.end_request(token)
+
+def require_admin():
+    supplied = request.headers.get('X-Admin-Token', '')
+    if not PROFILER_ADMIN_TOKEN:
+        abort(404)
+    if not hmac.compare_digest(supplied, PROFILER_ADMIN_TOKEN):
+        abort(403)
+
 prediction_count = Counter('prediction_count', 'Number of predictions made')
 drift_count = Counter('drift_count', 'Number of drift detections')
+redis_pool_connections = Gauge('redis_pool_connections', 'Feature store Redis pool connections by state', ['state'])
+passenger_prediction_count = Counter('passenger_prediction_count', 'Predictions served for known passengers', ['source'])
 
 # Load the trained model
 MODEL_PATH = "artifacts/models/random_forest_model.pkl"
 
 def load_model():
-    """Load the trained model"""
+    """Load the trained model and its version, the content hash of the loaded pickle"""
     try:
         with open(MODEL_PATH, 'rb') as file:
-            model = pickle.load(file)
-        logger.info(f"Model loaded successfully from {MODEL_PATH}")
-        return model
+            model_bytes = file.read()
+        # Hash the bytes actually served: model_metadata.json goes stale when the pickle is swapped.
+        version = hashlib.sha256(model_bytes).hexdigest()[:12]
+        model = pickle.loads(model_bytes)
+        logger.info(f"Model {version} loaded successfully from {MODEL_PATH}")
+        return model, version
     except Exception as e:
         logger.error(f"Error loading model: {e}")
+        return None, None
+
+
+# Optional candidate model scored in the background on sampled traffic, for comparison
+# with the serving model before it is promoted.
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "64"))
+
+def load_shadow_scorer():
+    """Load the shadow model, if one is configured"""
+    if not SHADOW_MODEL_PATH:
+        return None
+    try:
+        from src.shadow_scoring import ShadowScorer
+        with open(SHADOW_MODEL_PATH, 'rb') as file:
+            model_bytes = file.read()
+        # Same content hash ModelTraining records as the model version.
+        shadow_version = hashlib.sha256(model_bytes).hexdigest()[:12]
+        scorer = ShadowScorer(pickle.loads(model_bytes), shadow_version,
+                              sample_rate=SHADOW_SAMPLE_RATE, max_pending=SHADOW_MAX_PENDING)
+        logger.info(f"Shadow model {shadow_version} loaded from {SHADOW_MODEL_PATH}, "
+                    f"sampling {SHADOW_SAMPLE_RATE:.0%} of predictions")
+        return scorer
+    except Exception as e:
+        logger.error(f"Error loading shadow model: {e}")
         return None
 
-model = load_model()
 
 def extract_title(name):
     """Extract title from passenger name"""
+    import pandas as pd
     if pd.isna(name):
         return 'Unknown'
     
@@ -63,6 +137,7 @@ def extract_title(name):
             return title_value
     return 'Other'
 
+@traced()
 def preprocess_input(data):
     """Preprocess input data to match training format"""
     # Calculate derived features
@@ -94,21 +169,48 @@ def preprocess_input(data):
     ]
     
     # Return as DataFrame with feature names to avoid sklearn warnings
+    import pandas as pd
     feature_names = ['Age', 'Fare', 'Pclass', 'Sex', 'Embarked', 'Familysize', 'Isalone', 'HasCabin', 'Title', 'Pclass_Fare', 'Age_Fare']
     return pd.DataFrame([feature_values], columns=feature_names)
 
-feature_store = FeatureStore()
 # Use actual feature names as stored in Redis
 features = ['Age', 'Fare', 'Pclass', 'Sex', 'Embarked', 'Familysize', 'Isalone', 'HasCabin', 'Title', 'Pclass_Fare', 'Age_Fare']
-scaler = StandardScaler()
+
+# The model, feature store, scaler and drift detector are loaded by a warm-up thread,
+# started by __main__ or by the first request a serving process handles (so after any
+# fork), or on first use, so that importing the app and /health stay cheap and pandas,
+# sklearn and alibi_detect are only imported by the code that needs them. Each artifact
+# is loaded once: a failure leaves it unavailable instead of being retried under the
+# lock on every request.
+model = None
+model_version = None
+shadow_scorer = None
+feature_store = None
+scaler = None
+historical_data = None
+ksd = None
+serving_loaded = False
+serving_lock = threading.Lock()
+warmup_started = False
+
+for pool_state in ('in_use', 'idle', 'max'):
+    redis_pool_connections.labels(state=pool_state).set_function(
+        lambda pool_state=pool_state: feature_store.pool_stats()[pool_state] if feature_store is not None else 0)
 
 def fit_scaler_on_ref_data():
-    entity_ids = feature_store.get_all_entity_ids()
-    if not entity_ids:
-        logger.warning("No entity IDs found in Redis. Please run the training pipeline first.")
+    if feature_store is None:
+        return None
+    try:
+        entity_ids = feature_store.get_all_entity_ids()
+        if not entity_ids:
+            logger.warning("No entity IDs found in Redis. Please run the training pipeline first.")
+            return None
+
+        all_features = feature_store.get_batch_features(entity_ids)
+    except Exception as e:
+        # An unreachable feature store only disables drift detection; the model still serves.
+        logger.error(f"Error reading reference data from the feature store: {e}")
         return None
-    
-    all_features = feature_store.get_batch_features(entity_ids)
     # Filter out None values and create DataFrame
     valid_features = {k: v for k, v in all_features.items() if v is not None}
     
@@ -116,19 +218,54 @@ def fit_scaler_on_ref_data():
         logger.warning("No valid features found in Redis.")
         return None
         
+    import pandas as pd
     all_features_df = pd.DataFrame.from_dict(valid_features, orient='index')[features]
     scaler.fit(all_features_df)
     logger.info(f"Scaler fitted on {len(valid_features)} reference data points")
     return all_features_df.values
 
-# Initialize historical data and drift detector only if data is available
-historical_data = fit_scaler_on_ref_data()
-if historical_data is not None:
-    ksd = KSDrift(x_ref=historical_data, p_val=0.05)
-    logger.info("Drift detector initialized successfully")
-else:
-    ksd = None
-    logger.warning("Warning: Drift detection not available. Run training pipeline first.")
+def load_drift_detector(reference_data):
+    """Initialize the drift detector only if reference data is available"""
+    if reference_data is None:
+        logger.warning("Warning: Drift detection not available. Run training pipeline first.")
+        return None
+    try:
+        from alibi_detect.cd import KSDrift
+        detector = KSDrift(x_ref=reference_data, p_val=0.05)
+        logger.info("Drift detector initialized successfully")
+        return detector
+    except Exception as e:
+        logger.error(f"Error initializing drift detector: {e}")
+        return None
+
+def load_serving_state():
+    """Load the model and serving artifacts once; later calls return immediately"""
+    global model, model_version, shadow_scorer, feature_store, scaler, historical_data, ksd, serving_loaded
+    if serving_loaded:
+        return
+    with serving_lock:
+        if serving_loaded:
+            return
+        try:
+            from sklearn.preprocessing import StandardScaler
+            from src.feature_store import create_feature_store
+
+            model, model_version = load_model()
+            shadow_scorer = load_shadow_scorer()
+            try:
+                feature_store = create_feature_store()
+            except Exception as e:
+                logger.error(f"Error creating feature store: {e}")
+                feature_store = None
+            scaler = StandardScaler()
+            historical_data = fit_scaler_on_ref_data()
+            ksd = load_drift_detector(historical_data)
+
+            record_artifacts({'model': model, 'historical_data': historical_data, 'scaler': scaler, 'drift_detector': ksd,
+                              'shadow_model': shadow_scorer.model if shadow_scorer is not None else None},
+                             reference_data=historical_data)
+        finally:
+            serving_loaded = True
 
 @app.route('/')
 def index():
@@ -139,6 +276,7 @@ def index():
 def predict():
     """Make prediction based on input data"""
     try:
+        load_serving_state()
         if model is None:
             logger.error("Model not loaded for prediction")
             return jsonify({'error': 'Model not loaded'}), 500
@@ -163,8 +301,10 @@ def predict():
         
         # Check for drift only if drift detector is available
         if ksd is not None and historical_data is not None:
-            features_scaled = scaler.transform(features_df)
-            drift = ksd.predict(features_scaled)
+            with span("drift_detection"):
+                features_scaled = scaler.transform(features_df)
+                drift = ksd.predict(features_scaled)
+                set_span_attributes({"drift.detected": bool(drift['data']['is_drift'])})
             if drift['data']['is_drift']:
                 logger.warning(f"Data drift detected for prediction")
                 drift_count.inc()
@@ -174,10 +314,17 @@ def predict():
             logger.debug("Drift detection skipped - no reference data available")
         
         # Make prediction using DataFrame
-        prediction = model.predict(features_df)[0]
-        prediction_count.inc()
+        with span("model_scoring"):
+            prediction = model.predict(features_df)[0]
+            prediction_count.inc()
+
+            # Only predict_proba is timed, as that is all the shadow model runs.
+            scoring_start = time.perf_counter()
+            probability = model.predict_proba(features_df)[0]
+            scoring_seconds = time.perf_counter() - scoring_start
 
-        probability = model.predict_proba(features_df)[0]
+        if shadow_scorer is not None:
+            shadow_scorer.submit(features_df, float(probability[1]), scoring_seconds)
         
         logger.info(f"Prediction completed: survived={bool(prediction)}, probability={float(probability[1]):.3f}")
         
@@ -202,6 +349,75 @@ def predict():
         logger.error(f"Error during prediction: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
+@app.route('/predict/<passenger_id>', methods=['GET'])
+def predict_passenger(passenger_id):
+    """Serve the materialized prediction of a known passenger, scoring online on a store miss"""
+    try:
+        load_serving_state()
+        if model is None:
+            logger.error("Model not loaded for prediction")
+            return jsonify({'error': 'Model not loaded'}), 500
+
+        if feature_store is None:
+            logger.error("Feature store not available for prediction")
+            return jsonify({'error': 'Feature store not available'}), 503
+
+        prediction = feature_store.get_prediction(passenger_id)
+        if prediction is not None and prediction.get('model_version') == model_version:
+            source = 'materialized'
+        else:
+            passenger_features = feature_store.get_features(passenger_id)
+            if passenger_features is None:
+                return jsonify({'error': f'Unknown passenger {passenger_id}'}), 404
+            import pandas as pd
+            features_df = pd.DataFrame([passenger_features])[features]
+            # Only predict_proba is timed, as that is all the shadow model runs on the same frame.
+            scoring_start = time.perf_counter()
+            probability = float(model.predict_proba(features_df)[0, 1])
+            scoring_seconds = time.perf_counter() - scoring_start
+            prediction = {'survived': probability > 0.5, 'survival_probability': probability,
+                          'model_version': model_version}
+            source = 'online'
+            if shadow_scorer is not None:
+                shadow_scorer.submit(features_df, probability, scoring_seconds)
+
+        passenger_prediction_count.labels(source=source).inc()
+        return jsonify({
+            'passenger_id': passenger_id,
+            'survived': prediction['survived'],
+            'survival_probability': prediction['survival_probability'],
+            'death_probability': 1 - prediction['survival_probability'],
+            'model_version': prediction['model_version'],
+            'source': source
+        })
+
+    except Exception as e:
+        logger.error(f"Error during prediction for passenger {passenger_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/admin/profile', methods=['POST'])
+def start_profile():
+    """Arm request profiling: ?requests=N and/or ?seconds=S, ?mode=cprofile|sample"""
+    require_admin()
+    try:
+        requests_limit = request.args.get('requests', type=int)
+        seconds = request.args.get('seconds', type=float)
+        profiler.start(requests=requests_limit, seconds=seconds,
+                       mode=request.args.get('mode', 'cprofile'),
+                       interval=request.args.get('interval', 0.005, type=float))
+        return jsonify(profiler.status())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/admin/profile', methods=['GET'])
+def get_profile():
+    """Profiling status, or the collected profile with ?format=text|collapsed"""
+    require_admin()
+    fmt = request.args.get('format')
+    if fmt is None:
+        return jsonify(profiler.status())
+    return Response(profiler.report(fmt), content_type='text/plain')
+
 @app.route('/metrics')
 def metrics():
     """Expose Prometheus metrics"""
@@ -212,9 +428,23 @@ def metrics():
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'model_loaded': model is not None})
+    return jsonify({'status': 'healthy', 'ready': serving_loaded, 'model_loaded': serving_loaded and model is not None,
+                    'drift_detection': ksd is not None})
+
+def start_warmup():
+    """Load the serving state in a background thread, once per process"""
+    global warmup_started
+    if warmup_started or serving_loaded:
+        return
+    warmup_started = True
+    threading.Thread(target=load_serving_state, name="serving-warmup", daemon=True).start()
+
+@app.before_request
+def warm_up_serving_state():
+    start_warmup()
 
 if __name__ == '__main__':
     start_http_server(port=8000)
+    start_warmup()
     logger.info("Starting Flask application on host=0.0.0.0, port=5000")
     app.run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
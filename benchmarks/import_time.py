@@ -0,0 +1,145 @@
+"""
+Import Time Benchmark
+
+Measures the startup cost of every entry point: the cumulative import time of its
+module as reported by ``python -X importtime``, the wall-clock time of a fresh
+interpreter importing it, and its heaviest direct imports. Each measurement runs in
+a new process and the median over ``--repeats`` runs is reported.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --output import_times.json
+    python benchmarks/import_time.py --baseline import_times.json --tolerance 0.25
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = {
+    'app': 'app',
+    'training_pipeline': 'pipeline.training_pipeline',
+    'data_ingestion': 'src.data_ingestion',
+    'data_processing': 'src.data_processing',
+    'model_training': 'src.model_training',
+    'prediction_materialization': 'src.prediction_materialization',
+    'batch_scoring': 'src.batch_scoring',
+    'local_feature_store': 'src.local_feature_store'
+}
+
+# Absolute slack added to the relative tolerance, so sub-millisecond noise never fails a check.
+NOISE_FLOOR_MS = 20.0
+
+
+def _run(args):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def parse_importtime(stderr, module, top=5):
+    """Cumulative import time of ``module`` and its heaviest direct imports, in milliseconds."""
+    total_ms = None
+    children = []
+    heaviest = []
+    for line in stderr.splitlines():
+        # Lines read "import time: <self us> | <cumulative us> | <indented module name>".
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative_us, name = line.split("|")
+        if not cumulative_us.strip().isdigit():
+            continue
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        cumulative_ms = int(cumulative_us) / 1000
+        # A module is listed after its own imports, so the depth-1 lines gathered since
+        # the previous top-level module are the direct imports of this one.
+        if depth == 0:
+            if name == module:
+                total_ms = cumulative_ms
+                heaviest = sorted(children, key=lambda item: item[1], reverse=True)[:top]
+            children = []
+        elif depth == 1:
+            children.append((name.strip(), cumulative_ms))
+    return total_ms, [{'module': name, 'ms': round(ms, 1)} for name, ms in heaviest]
+
+
+def measure(module, repeats=3):
+    import_ms, wall_ms, heaviest = [], [], []
+    for _ in range(repeats):
+        result, _ = _run(["-X", "importtime", "-c", f"import {module}"])
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+            return {'module': module, 'error': error}
+        total, heaviest = parse_importtime(result.stderr, module)
+        import_ms.append(total)
+        _, elapsed = _run(["-c", f"import {module}"])
+        wall_ms.append(elapsed)
+    return {
+        'module': module,
+        'import_ms': round(statistics.median(import_ms), 1),
+        'wall_ms': round(statistics.median(wall_ms), 1),
+        'heaviest_imports': heaviest
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Entry points whose import time grew beyond ``tolerance`` (relative) plus the noise floor."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name, {})
+        if 'import_ms' not in current or 'import_ms' not in previous:
+            continue
+        limit = previous['import_ms'] * (1 + tolerance) + NOISE_FLOOR_MS
+        if current['import_ms'] > limit:
+            regressions.append(f"{name}: {previous['import_ms']:.0f} ms -> {current['import_ms']:.0f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of each entry point.")
+    parser.add_argument("entry_points", nargs="*",
+                        help=f"Entry points to measure (default: all): {', '.join(ENTRY_POINTS)}.")
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh-interpreter runs per entry point.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Earlier --output file; exit 1 if an entry point got slower.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown against the baseline.")
+    args = parser.parse_args()
+    unknown = [name for name in args.entry_points if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(unknown)}")
+
+    results = {name: measure(ENTRY_POINTS[name], args.repeats) for name in args.entry_points or ENTRY_POINTS}
+    _, interpreter_ms = _run(["-c", "pass"])
+
+    print(f"{'entry point':<28}{'import ms':>11}{'wall ms':>10}  heaviest imports")
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:<28}{'-':>11}{'-':>10}  failed: {result['error']}")
+            continue
+        heaviest = ", ".join(f"{item['module']} {item['ms']:.0f}" for item in result['heaviest_imports'][:3])
+        print(f"{name:<28}{result['import_ms']:>11.1f}{result['wall_ms']:>10.1f}  {heaviest}")
+    print(f"(bare interpreter startup: {interpreter_ms:.1f} ms)")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Import time regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
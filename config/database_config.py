@@ -4,4 +4,10 @@ DB_CONFIG = {
     'dbname': 'postgres',
     'user': 'postgres',
     'password': 'postgres'
-}
\ No newline at end of file
+}
+
+# Source table and the monotonically increasing column (an id or an updated-at
+# timestamp) used as the high-water mark for incremental ingestion.
+SOURCE_SCHEMA = 'public'
+SOURCE_TABLE = 'titanic'
+WATERMARK_COLUMN = 'PassengerId'
@@ -0,0 +1,11 @@
+import os
+
+# Engineered features stored per entity in the feature store, in model input order.
+FEATURE_COLUMNS = ['Age', 'Fare', 'Pclass', 'Sex', 'Embarked', 'Familysize', 'Isalone', 'HasCabin', 'Title', 'Pclass_Fare', 'Age_Fare']
+TARGET_COLUMN = 'Survived'
+
+# Share of entities held out for evaluation by the deterministic hash split.
+TEST_FRACTION = 0.2
+
+# Feature store backend: "redis" (default) or "local" for the memory-mapped single-node store.
+FEATURE_STORE_BACKEND = os.getenv('FEATURE_STORE_BACKEND', 'redis')
@@ -5,5 +5,31 @@ RAW_DIR = "artifacts/raw"
 TRAIN_PATH = os.path.join(RAW_DIR, "titanic_train.csv")
 TEST_PATH = os.path.join(RAW_DIR, "titanic_test.csv")
 
+# Columnar artifacts handed from ingestion to processing.
+# ARTIFACT_FORMAT is one of "parquet", "arrow" (Arrow IPC) or "csv".
+ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "parquet")
+ARTIFACT_COMPRESSION = os.getenv("ARTIFACT_COMPRESSION", "zstd")
+ARTIFACT_PARTITION_COLS = [col for col in os.getenv("ARTIFACT_PARTITION_COLS", "").split(",") if col]
+ARTIFACT_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+TRAIN_ARTIFACT_PATH = os.path.join(RAW_DIR, f"titanic_train{ARTIFACT_EXTENSIONS[ARTIFACT_FORMAT]}")
+TEST_ARTIFACT_PATH = os.path.join(RAW_DIR, f"titanic_test{ARTIFACT_EXTENSIONS[ARTIFACT_FORMAT]}")
+
+# Delta artifacts written by incremental ingestion runs.
+TRAIN_DELTA_ARTIFACT_PATH = os.path.join(RAW_DIR, f"titanic_train_delta{ARTIFACT_EXTENSIONS[ARTIFACT_FORMAT]}")
+TEST_DELTA_ARTIFACT_PATH = os.path.join(RAW_DIR, f"titanic_test_delta{ARTIFACT_EXTENSIONS[ARTIFACT_FORMAT]}")
+
+MODEL_DIR = "artifacts/models"
+MODEL_PATH = os.path.join(MODEL_DIR, "random_forest_model.pkl")
+MODEL_METADATA_PATH = os.path.join(MODEL_DIR, "model_metadata.json")
+
+# Memory-mapped snapshots of the local feature store backend.
+LOCAL_FEATURE_STORE_DIR = "artifacts/feature_store"
+
 PROCESSED_DIR = "artifacts/processed"
+IMPUTATION_STATS_PATH = os.path.join(PROCESSED_DIR, "imputation_stats.json")
 
+STATE_DIR = "artifacts/state"
+WATERMARK_PATH = os.path.join(STATE_DIR, "watermark.json")
+STAGE_MANIFEST_PATH = os.path.join(STATE_DIR, "stage_manifest.json")
+RUN_REPORT_PATH = os.path.join(STATE_DIR, "run_report.json")
@@ -0,0 +1,24 @@
+import os
+
+# Connection pool and resilience settings for the Redis feature store.
+REDIS_CONFIG = {
+    'host': os.getenv('REDIS_HOST', 'localhost'),
+    'port': int(os.getenv('REDIS_PORT', '6379')),
+    'db': int(os.getenv('REDIS_DB', '0')),
+    # Comma-separated host:port list to shard entities across several nodes; the first
+    # node also holds the snapshot pointer and registry. Empty means host:port only.
+    'nodes': [node.strip() for node in os.getenv('REDIS_NODES', '').split(',') if node.strip()],
+    'vnodes': int(os.getenv('REDIS_VNODES', '160')),
+    # Upper bound on open connections shared by all threads; callers wait up to
+    # pool_timeout seconds for a free one instead of opening more.
+    'max_connections': int(os.getenv('REDIS_MAX_CONNECTIONS', '50')),
+    'pool_timeout': float(os.getenv('REDIS_POOL_TIMEOUT', '2')),
+    'socket_connect_timeout': float(os.getenv('REDIS_CONNECT_TIMEOUT', '1')),
+    'socket_timeout': float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.5')),
+    'socket_keepalive': os.getenv('REDIS_SOCKET_KEEPALIVE', 'true').lower() == 'true',
+    'health_check_interval': int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', '30')),
+    # Exponential backoff retries on connection errors and timeouts.
+    'retries': int(os.getenv('REDIS_RETRIES', '3')),
+    'backoff_base': float(os.getenv('REDIS_BACKOFF_BASE', '0.05')),
+    'backoff_cap': float(os.getenv('REDIS_BACKOFF_CAP', '1'))
+}
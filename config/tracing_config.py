@@ -0,0 +1,12 @@
+import os
+
+# OpenTelemetry tracing. The exporter is "none" (tracing off), "console", "file" (one JSON
+# span per line in file_path, for offline analysis) or "otlp" (configured by the standard
+# OTEL_EXPORTER_OTLP_* variables). Root spans are sampled at sample_ratio; child spans
+# and requests carrying a W3C traceparent follow their parent's decision.
+TRACING_CONFIG = {
+    'exporter': os.getenv('TRACING_EXPORTER', 'none'),
+    'sample_ratio': float(os.getenv('TRACING_SAMPLE_RATIO', '1.0')),
+    'file_path': os.getenv('TRACING_FILE', os.path.join('logs', 'traces.jsonl')),
+    'service_name': os.getenv('OTEL_SERVICE_NAME', 'titanic-survivor')
+}
@@ -0,0 +1,154 @@
+"""
+Stage Runner Module
+
+Runs pipeline stages behind a content-addressed cache. Each stage is fingerprinted
+from its inputs (source data hashes, configuration and the source code of the
+components it runs); when the fingerprint and the outputs recorded in the local
+manifest still match, the stage is skipped and its recorded result is reused.
+Every stage, run or skipped, is timed and listed in the run report.
+"""
+
+import os
+import sys
+import json
+import time
+import inspect
+import hashlib
+from datetime import datetime
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.tracing import span, set_span_attributes
+
+logger = get_logger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_path(path):
+    """Hash a file, or every file below a directory (e.g. a partitioned Parquet dataset)."""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                digest.update(hash_path(file_path).encode())
+        return digest.hexdigest()
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(*objects):
+    """Hash the source files defining ``objects`` (classes, functions or modules)."""
+    digest = hashlib.sha256()
+    for source_file in sorted({inspect.getsourcefile(obj) for obj in objects}):
+        digest.update(hash_path(source_file).encode())
+    return digest.hexdigest()
+
+
+def fingerprint(inputs):
+    """Hash a JSON-serialisable description of a stage's inputs."""
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StageRunner:
+
+    def __init__(self, manifest_path, force=False):
+        self.manifest_path = manifest_path
+        self.force = force
+        self.manifest = self.load_manifest()
+        self.report = []
+
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as file:
+            return json.load(file)
+
+    def save_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def stage_fingerprint(self, name):
+        """Fingerprint of the last completed run of ``name``, for use as a downstream input."""
+        entry = self.manifest.get(name)
+        return entry["fingerprint"] if entry else None
+
+    def outputs_match(self, entry, output_check):
+        for path, digest in entry.get("outputs", {}).items():
+            if not os.path.exists(path) or hash_path(path) != digest:
+                return False
+        return output_check is None or output_check()
+
+    def run_stage(self, name, func, inputs, outputs=None, output_check=None):
+        """
+        Run ``func`` unless a previous run with the same inputs left matching outputs.
+
+        Args:
+            name (str): Stage name, used as the manifest key.
+            func (callable): Stage body. Its JSON-serialisable return value is recorded
+                and returned again when the stage is skipped.
+            inputs (dict): Everything the stage output depends on.
+            outputs (list, optional): Files or directories the stage writes. Missing
+                paths are ignored, since a stage may legitimately write nothing.
+            output_check (callable, optional): Extra check that non-file outputs
+                (e.g. features in Redis) are still present.
+
+        Returns:
+            The stage result, fresh or cached.
+        """
+        with span(f"stage {name}", {"stage.name": name}):
+            return self._run_stage(name, func, inputs, outputs, output_check)
+
+    def _run_stage(self, name, func, inputs, outputs, output_check):
+        try:
+            start = time.perf_counter()
+            stage_fingerprint = fingerprint(inputs)
+            entry = self.manifest.get(name)
+
+            if (not self.force and entry is not None and entry["fingerprint"] == stage_fingerprint
+                    and self.outputs_match(entry, output_check)):
+                elapsed = time.perf_counter() - start
+                logger.info(f"Stage {name} is up to date, skipping ({elapsed:.2f}s to verify).")
+                self.report.append({"stage": name, "status": "skipped", "seconds": round(elapsed, 3)})
+                set_span_attributes({"stage.status": "skipped"})
+                return entry.get("result")
+
+            logger.info(f"Running stage {name}...")
+            result = func()
+            elapsed = time.perf_counter() - start
+
+            self.manifest[name] = {
+                "fingerprint": stage_fingerprint,
+                "outputs": {path: hash_path(path) for path in outputs or [] if os.path.exists(path)},
+                "result": result,
+                "completed_at": datetime.now().isoformat(),
+                "seconds": round(elapsed, 3)
+            }
+            self.save_manifest()
+            self.report.append({"stage": name, "status": "ran", "seconds": round(elapsed, 3)})
+            set_span_attributes({"stage.status": "ran"})
+            logger.info(f"Stage {name} completed in {elapsed:.2f}s.")
+            return result
+
+        except Exception as e:
+            self.report.append({"stage": name, "status": "failed", "seconds": round(time.perf_counter() - start, 3)})
+            logger.error(f"Stage {name} failed: {e}")
+            raise CustomException(str(e), sys)
+
+    def write_report(self, report_path):
+        """Log the per-stage timings of this run and persist them next to the manifest."""
+        for row in self.report:
+            logger.info(f"{row['stage']:<20} {row['status']:<8} {row['seconds']:>10.3f}s")
+        with open(report_path, "w") as file:
+            json.dump({"finished_at": datetime.now().isoformat(), "stages": self.report}, file, indent=2)
+        return self.report
@@ -1,17 +1,129 @@
+import os
+import pickle
+import argparse
 from src.data_ingestion import DataIngestion
 from src.data_processing import DataProcessor
 from src.model_training import ModelTraining
-from src.feature_store import FeatureStore
+from src.feature_store import create_feature_store
+from src.resampling import Resampler
+from src.prediction_materialization import PredictionMaterializer, load_model_version
+from src.watermark import WatermarkStore
+from src.logger import get_logger
+from src.tracing import configure_tracing, span
+from pipeline.stage_runner import StageRunner, code_version, hash_path
 from config.paths_config import *
-from config.database_config import DB_CONFIG
+from config.database_config import DB_CONFIG, WATERMARK_COLUMN
+from config import feature_config
+
+logger = get_logger(__name__)
 
 
 if __name__=="__main__":
 
-    data_ingestion = DataIngestion(DB_CONFIG , RAW_DIR)
-    data_ingestion.run()
-    feature_store = FeatureStore()
-    data_processor = DataProcessor(TRAIN_PATH,TEST_PATH,feature_store)
-    data_processor.run()
-    model_trainer = ModelTraining(feature_store)
-    model_trainer.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the Titanic training pipeline.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only ingest and process rows past the stored high-water mark.")
+    parser.add_argument("--force", action="store_true",
+                        help="Run every stage even if its inputs are unchanged since the last run.")
+    parser.add_argument("--search-mode", choices=["random", "halving"], default="random",
+                        help="Hyperparameter search: full randomized search or budgeted successive halving.")
+    parser.add_argument("--search-budget", type=float, default=None,
+                        help="Wall-clock budget in seconds for the successive halving search.")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Stream training features from the store in chunks of this many entities.")
+    parser.add_argument("--memmap-dir", default=None,
+                        help="Back the streamed training matrices with memory-mapped files in this directory.")
+    parser.add_argument("--resampling", choices=["smote", "class_weight", "none"], default="smote",
+                        help="Oversample the training split with SMOTE, weight classes instead, or do neither.")
+    parser.add_argument("--smote-neighbors", choices=["exact", "partitioned"], default="exact",
+                        help="Exact k-NN search or approximate search within random stratified partitions.")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Cores used for resampling.")
+    parser.add_argument("--compaction-tolerance", type=float, default=None,
+                        help="Shrink the tuned forest to the smallest one within this held-out accuracy drop.")
+    args = parser.parse_args()
+
+    configure_tracing("training-pipeline")
+
+    with span("training_pipeline", {"pipeline.incremental": args.incremental, "pipeline.force": args.force,
+                                    "pipeline.search_mode": args.search_mode}):
+        runner = StageRunner(STAGE_MANIFEST_PATH, force=args.force)
+
+        watermark_store = WatermarkStore(WATERMARK_PATH, WATERMARK_COLUMN)
+        data_ingestion = DataIngestion(DB_CONFIG , RAW_DIR, watermark_store=watermark_store)
+
+        def ingest():
+            data_ingestion.run(incremental=args.incremental)
+            # The pending watermark is part of the recorded result, so a later run that
+            # reuses this stage still commits it once processing succeeds.
+            return {"rows_extracted": data_ingestion.rows_extracted, "is_delta": data_ingestion.is_delta,
+                    "pending_watermark": data_ingestion.pending_watermark}
+
+        watermark = watermark_store.load() if args.incremental else None
+        ingestion_result = runner.run_stage(
+            "data_ingestion", ingest,
+            inputs={
+                "source": data_ingestion.source_fingerprint(since=watermark),
+                "incremental": args.incremental,
+                "watermark": watermark,
+                "config": [ARTIFACT_FORMAT, ARTIFACT_COMPRESSION, ARTIFACT_PARTITION_COLS, WATERMARK_COLUMN],
+                "code": code_version(DataIngestion)
+            },
+            outputs=[TRAIN_ARTIFACT_PATH, TEST_ARTIFACT_PATH, TRAIN_DELTA_ARTIFACT_PATH, TEST_DELTA_ARTIFACT_PATH]
+        )
+
+        if ingestion_result["rows_extracted"] == 0:
+            logger.info("Source table unchanged since the last run, skipping processing and training.")
+        else:
+            feature_store = create_feature_store()
+            if ingestion_result["is_delta"]:
+                train_path, test_path = TRAIN_DELTA_ARTIFACT_PATH, TEST_DELTA_ARTIFACT_PATH
+            else:
+                train_path, test_path = TRAIN_ARTIFACT_PATH, TEST_ARTIFACT_PATH
+            data_processor = DataProcessor(train_path,test_path,feature_store,incremental=ingestion_result["is_delta"])
+
+            runner.run_stage(
+                "data_processing", data_processor.run,
+                inputs={
+                    "data": [hash_path(path) for path in (train_path, test_path) if os.path.exists(path)],
+                    "incremental": ingestion_result["is_delta"],
+                    "code": code_version(DataProcessor, type(feature_store))
+                },
+                output_check=feature_store.has_features
+            )
+            data_ingestion.commit_watermark(ingestion_result.get("pending_watermark"))
+
+            model_trainer = ModelTraining(feature_store, search_mode=args.search_mode,
+                                          search_budget_seconds=args.search_budget,
+                                          chunk_size=args.chunk_size, memmap_dir=args.memmap_dir,
+                                          resampler=Resampler(args.resampling, args.smote_neighbors, n_jobs=args.n_jobs),
+                                          compaction_tolerance=args.compaction_tolerance)
+            model_path = os.path.join(model_trainer.model_save_path, "random_forest_model.pkl")
+            runner.run_stage(
+                "model_training", model_trainer.run,
+                inputs={
+                    "features": runner.stage_fingerprint("data_processing"),
+                    "search": [args.search_mode, args.search_budget],
+                    "chunked": args.chunk_size is not None,
+                    "resampling": [args.resampling, args.smote_neighbors],
+                    "compaction_tolerance": args.compaction_tolerance,
+                    "code": code_version(ModelTraining, Resampler, feature_config)
+                },
+                outputs=[model_path]
+            )
+
+            def materialize():
+                with open(model_path, 'rb') as file:
+                    model = pickle.load(file)
+                model_version = load_model_version(model_path, os.path.join(model_trainer.model_save_path, "model_metadata.json"))
+                return PredictionMaterializer(feature_store, model, model_version).run()
+
+            runner.run_stage(
+                "prediction_materialization", materialize,
+                inputs={
+                    "features": runner.stage_fingerprint("data_processing"),
+                    "model": runner.stage_fingerprint("model_training"),
+                    "code": code_version(PredictionMaterializer)
+                }
+            )
+
+        runner.write_report(RUN_REPORT_PATH)
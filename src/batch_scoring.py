@@ -0,0 +1,159 @@
+"""
+Batch Scoring Module
+
+Offline scoring of large passenger files. The input CSV or Parquet file is streamed
+in chunks, each chunk is preprocessed exactly like training data (``engineer_features``
+with the persisted imputation stats) and scored in a pool of worker processes, and
+predictions are written to the output file in input order. At most a few chunks
+per worker are in flight, so memory stays bounded regardless of the input size.
+
+Usage:
+    python -m src.batch_scoring artifacts/raw/titanic_test.csv predictions.csv --workers 4
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.columnar_io import RAW_DTYPES, artifact_format
+from src.data_processing import PROCESSING_COLUMNS, engineer_features
+from config.feature_config import FEATURE_COLUMNS
+from config.paths_config import MODEL_PATH, IMPUTATION_STATS_PATH
+
+logger = get_logger(__name__)
+
+# Per-process state, loaded once by the pool initializer.
+_worker_model = None
+_worker_stats = None
+
+
+def _init_worker(model_path, stats):
+    global _worker_model, _worker_stats
+    with open(model_path, 'rb') as file:
+        _worker_model = pickle.load(file)
+    _worker_stats = stats
+
+
+def _score_chunk(chunk, id_column):
+    features_df = engineer_features(chunk, _worker_stats)[FEATURE_COLUMNS]
+    probabilities = _worker_model.predict_proba(features_df)[:, 1]
+    return pd.DataFrame({
+        id_column: chunk[id_column].to_numpy(),
+        'survived': (probabilities > 0.5).astype(int),
+        'survival_probability': probabilities
+    })
+
+
+def iter_chunks(input_path, chunk_size, id_column=None):
+    """Stream the raw columns needed for scoring, plus ``id_column``, from a CSV or Parquet file."""
+    wanted = set(PROCESSING_COLUMNS) - {'Survived'}
+    if id_column is not None:
+        wanted.add(id_column)
+    if artifact_format(input_path) == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(input_path, memory_map=True)
+        columns = [col for col in parquet_file.schema_arrow.names if col in wanted]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        dtypes = {col: dtype for col, dtype in RAW_DTYPES.items() if col in wanted}
+        yield from pd.read_csv(input_path, usecols=lambda col: col in wanted, dtype=dtypes, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet output file."""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.parquet_writer = None
+        self.header_written = False
+
+    def write(self, df):
+        if artifact_format(self.output_path) == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.output_path, mode='a' if self.header_written else 'w', header=not self.header_written, index=False)
+            self.header_written = True
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+class BatchScorer:
+
+    def __init__(self, model_path=MODEL_PATH, imputation_stats_path=IMPUTATION_STATS_PATH,
+                 chunk_size=50000, workers=None, id_column='PassengerId'):
+        self.model_path = model_path
+        self.imputation_stats_path = imputation_stats_path
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count()
+        self.id_column = id_column
+        # Bound on chunks submitted but not yet written, which caps memory use.
+        self.max_in_flight = self.workers * 2
+
+    def run(self, input_path, output_path):
+        try:
+            with open(self.imputation_stats_path) as file:
+                stats = json.load(file)
+
+            logger.info(f"Scoring {input_path} into {output_path} with {self.workers} workers...")
+            start = time.perf_counter()
+            rows = 0
+            writer = ChunkWriter(output_path)
+            pending = deque()
+
+            def write_next():
+                nonlocal rows
+                scored = pending.popleft().result()
+                writer.write(scored)
+                rows += len(scored)
+                elapsed = time.perf_counter() - start
+                logger.info(f"Scored {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)")
+
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(self.model_path, stats)) as executor:
+                for chunk in iter_chunks(input_path, self.chunk_size, self.id_column):
+                    if len(pending) >= self.max_in_flight:
+                        write_next()
+                    pending.append(executor.submit(_score_chunk, chunk, self.id_column))
+                while pending:
+                    write_next()
+            writer.close()
+
+            elapsed = time.perf_counter() - start
+            report = {'rows': rows, 'seconds': round(elapsed, 3),
+                      'rows_per_second': round(rows / elapsed, 1) if elapsed else None, 'workers': self.workers}
+            logger.info(f"Batch scoring completed: {report}")
+            return report
+
+        except Exception as e:
+            logger.error(f"Error during batch scoring: {e}")
+            raise CustomException(str(e), sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of passengers offline.")
+    parser.add_argument("input_path", help="Raw passenger rows (.csv or .parquet).")
+    parser.add_argument("output_path", help="Predictions file (.csv or .parquet).")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per chunk.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--id-column", default="PassengerId")
+    args = parser.parse_args()
+
+    scorer = BatchScorer(model_path=args.model_path, chunk_size=args.chunk_size,
+                         workers=args.workers, id_column=args.id_column)
+    print(json.dumps(scorer.run(args.input_path, args.output_path)))
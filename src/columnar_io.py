@@ -0,0 +1,159 @@
+"""
+Columnar IO Module
+
+Reads and writes the tabular artifacts handed between pipeline stages.
+Parquet and Arrow IPC files are written with an explicit schema and read back
+through memory maps with column projection, so downstream stages skip CSV
+parsing and type inference entirely. CSV is kept as a fallback whenever
+pyarrow is unavailable or only a CSV artifact exists on disk.
+"""
+
+import os
+import shutil
+import pandas as pd
+from src.logger import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pq = None
+
+logger = get_logger(__name__)
+
+# Explicit dtypes of the raw titanic table, so no stage relies on type inference.
+RAW_DTYPES = {
+    'PassengerId': 'int64',
+    'Survived': 'int64',
+    'Pclass': 'int64',
+    'Name': 'object',
+    'Sex': 'object',
+    'Age': 'float64',
+    'SibSp': 'int64',
+    'Parch': 'int64',
+    'Ticket': 'object',
+    'Fare': 'float64',
+    'Cabin': 'object',
+    'Embarked': 'object'
+}
+
+
+def csv_fallback_path(path):
+    """Return the CSV artifact path that shadows a columnar artifact path."""
+    return os.path.splitext(path)[0] + ".csv"
+
+
+def artifact_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        return "parquet"
+    if extension in (".arrow", ".feather", ".ipc"):
+        return "arrow"
+    return "csv"
+
+
+def apply_raw_dtypes(df):
+    """Cast the known raw columns of ``df`` to their declared dtypes."""
+    dtypes = {col: dtype for col, dtype in RAW_DTYPES.items() if col in df.columns}
+    return df.astype(dtypes)
+
+
+def replace_path(source, target):
+    """Move ``source`` over ``target``, removing whatever file or directory ``target`` held."""
+    previous = None
+    if os.path.lexists(target):
+        previous = f"{target}.old-{os.getpid()}"
+        os.replace(target, previous)
+    os.replace(source, target)
+    if previous is not None:
+        if os.path.isdir(previous) and not os.path.islink(previous):
+            shutil.rmtree(previous)
+        else:
+            os.remove(previous)
+
+
+def write_frame(df, path, compression=None, partition_cols=None):
+    """
+    Writes ``df`` to ``path`` in the format implied by its extension.
+
+    Args:
+        df (pd.DataFrame): Frame to persist.
+        path (str): Target path ending in .parquet, .arrow or .csv.
+        compression (str, optional): Codec for columnar formats (e.g. "zstd", "snappy").
+        partition_cols (list, optional): Columns to hive-partition a Parquet dataset by.
+            The path is then written as a directory.
+
+    Returns:
+        str: The path actually written, which is the CSV fallback path when
+        pyarrow is unavailable.
+    """
+    df = apply_raw_dtypes(df)
+    fmt = artifact_format(path)
+
+    if fmt != "csv" and pa is None:
+        path = csv_fallback_path(path)
+        logger.warning(f"pyarrow is not installed, falling back to CSV artifact at {path}")
+        fmt = "csv"
+
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return path
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if fmt == "parquet":
+        # Partitions missing from ``df`` would survive an in-place dataset write, so the
+        # artifact is written next to ``path`` and swapped in whole, replacing a previous
+        # dataset directory or single file.
+        staging_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(staging_path, ignore_errors=True)
+        if partition_cols:
+            pq.write_to_dataset(table, root_path=staging_path, partition_cols=partition_cols,
+                                compression=compression)
+        else:
+            pq.write_table(table, staging_path, compression=compression)
+        replace_path(staging_path, path)
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression if compression in ("lz4", "zstd") else None)
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+    return path
+
+
+def read_frame(path, columns=None):
+    """
+    Reads an artifact written by ``write_frame``.
+
+    Columnar artifacts are memory-mapped and only ``columns`` are materialised.
+    When the columnar artifact is missing, or pyarrow is unavailable, the CSV
+    sibling of ``path`` is parsed with the declared raw dtypes instead.
+
+    Args:
+        path (str): Artifact path.
+        columns (list, optional): Columns to project; all columns when omitted.
+
+    Returns:
+        pd.DataFrame: The loaded frame.
+    """
+    fmt = artifact_format(path)
+
+    if fmt != "csv" and (pa is None or not os.path.exists(path)):
+        fallback = csv_fallback_path(path)
+        logger.warning(f"Columnar artifact {path} unavailable, reading CSV fallback {fallback}")
+        path, fmt = fallback, "csv"
+
+    if fmt == "csv":
+        dtypes = {col: dtype for col, dtype in RAW_DTYPES.items() if columns is None or col in columns}
+        return pd.read_csv(path, usecols=columns, dtype=dtypes)
+
+    if fmt == "parquet":
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+
+    # Partition columns come back dictionary-encoded, so re-apply the declared dtypes.
+    return apply_raw_dtypes(table.to_pandas())
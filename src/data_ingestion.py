@@ -1,20 +1,30 @@
 import os
 import sys
 import psycopg2
+from psycopg2 import sql
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from src.logger import get_logger
 from src.custom_exception import CustomException
-from config.database_config import DB_CONFIG
+from src.tracing import traced
+from src.columnar_io import write_frame
+from src.watermark import serialize_watermark
+from config.database_config import DB_CONFIG, SOURCE_SCHEMA, SOURCE_TABLE, WATERMARK_COLUMN
 from config.paths_config import *
 
 logger = get_logger(__name__)
 
 class DataIngestion:
 
-    def __init__(self, db_params, output_dir):
+    def __init__(self, db_params, output_dir, watermark_store=None, watermark_column=WATERMARK_COLUMN):
         self.db_params = db_params
         self.output_dir = output_dir
+        self.watermark_store = watermark_store
+        self.watermark_column = watermark_column
+
+        self.rows_extracted = 0
+        self.is_delta = False
+        self.pending_watermark = None
         
         os.makedirs(self.output_dir, exist_ok=True)
 
@@ -35,36 +45,106 @@ class DataIngestion:
             logger.error(f"Error connecting to database: {e}")
             raise CustomException(str(e), sys)
 
-    def extract_data(self):
+    @traced()
+    def extract_data(self, since=None):
         try:
             conn = self.connect_to_db()
-            query = "SELECT * FROM public.titanic"
-            df = pd.read_sql_query(query, conn)
+            table = sql.Identifier(SOURCE_SCHEMA, SOURCE_TABLE)
+            if since is None:
+                query = sql.SQL("SELECT * FROM {}").format(table)
+                params = None
+            else:
+                query = sql.SQL("SELECT * FROM {} WHERE {} > %s").format(table, sql.Identifier(self.watermark_column))
+                params = (since,)
+            df = pd.read_sql_query(query.as_string(conn), conn, params=params)
             conn.close()
-            logger.info("Data extracted from database.")
+            if since is None:
+                logger.info("Data extracted from database.")
+            else:
+                logger.info(f"Extracted {len(df)} rows with {self.watermark_column} > {since} from database.")
             return df
         
         except Exception as e:
             logger.error(f"Error while extracting data: {e}")
             raise CustomException(str(e), sys)
     
-    def save_data(self, df):
+    def source_fingerprint(self, since=None):
+        """
+        Cheap fingerprint of the source table, computed inside the database without
+        concatenating rows: the row count, the highest watermark and an order-independent
+        sum of 64-bit per-row hashes. With ``since``, only rows past that watermark are
+        fingerprinted, so incremental runs cost time proportional to the delta.
+        """
+        try:
+            conn = self.connect_to_db()
+            watermark = sql.Identifier(self.watermark_column)
+            query = sql.SQL(
+                "SELECT count(*), max(t.{}), coalesce(sum(('x' || substr(md5(t::text), 1, 16))::bit(64)::bigint), 0) FROM {} t"
+            ).format(watermark, sql.Identifier(SOURCE_SCHEMA, SOURCE_TABLE))
+            params = None
+            if since is not None:
+                query = query + sql.SQL(" WHERE t.{} > %s").format(watermark)
+                params = (since,)
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                row_count, max_watermark, row_hash_sum = cursor.fetchone()
+            conn.close()
+            return f"{row_count}:{max_watermark}:{row_hash_sum}"
+
+        except Exception as e:
+            logger.error(f"Error while fingerprinting source data: {e}")
+            raise CustomException(str(e), sys)
+
+    @traced()
+    def save_data(self, df, delta=False):
         try:
-            train_df, test_df = train_test_split(df, test_size=0.2, random_state=42)
-            train_df.to_csv(TRAIN_PATH, index=False)
-            test_df.to_csv(TEST_PATH, index=False)
+            if len(df) > 1:
+                train_df, test_df = train_test_split(df, test_size=0.2, random_state=42)
+            else:
+                train_df, test_df = df, df.iloc[0:0]
+            train_target = TRAIN_DELTA_ARTIFACT_PATH if delta else TRAIN_ARTIFACT_PATH
+            test_target = TEST_DELTA_ARTIFACT_PATH if delta else TEST_ARTIFACT_PATH
+            train_path = write_frame(train_df, train_target,
+                                     compression=ARTIFACT_COMPRESSION, partition_cols=ARTIFACT_PARTITION_COLS)
+            test_path = write_frame(test_df, test_target,
+                                    compression=ARTIFACT_COMPRESSION, partition_cols=ARTIFACT_PARTITION_COLS)
 
-            logger.info(f"Train and Test data saved to {TRAIN_PATH} and {TEST_PATH}.")
+            logger.info(f"Train and Test data saved to {train_path} and {test_path}.")
 
         except Exception as e:
             logger.error(f"Error while saving data: {e}")
             raise CustomException(str(e), sys)
         
-    def run(self):
+    def commit_watermark(self, value=None):
+        """
+        Persist the high-water mark of the last run once its rows have been processed.
+        ``value`` overrides the pending mark, e.g. one recorded by a cached ingestion run.
+        """
+        value = self.pending_watermark if value is None else value
+        if self.watermark_store is not None and value is not None:
+            self.watermark_store.save(value)
+            self.pending_watermark = None
+
+    @traced()
+    def run(self, incremental=False):
         try:
             logger.info("Starting data ingestion process.")
-            df = self.extract_data()
-            self.save_data(df)
+            since = None
+            if incremental and self.watermark_store is not None:
+                since = self.watermark_store.load()
+                if since is None:
+                    logger.info("No watermark found, falling back to a full load.")
+
+            df = self.extract_data(since)
+            self.rows_extracted = len(df)
+            self.is_delta = since is not None
+
+            if self.rows_extracted == 0:
+                logger.info("No new rows since the last run, nothing to ingest.")
+                return
+
+            self.save_data(df, delta=self.is_delta)
+            self.pending_watermark = serialize_watermark(df[self.watermark_column].max())
             logger.info("Data ingestion completed successfully.")
         
         except Exception as e:
@@ -1,21 +1,67 @@
+import os
 import sys
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from imblearn.over_sampling import SMOTE
-from src.feature_store import FeatureStore
+import json
+from src.feature_store import FeatureStore, create_feature_store
 from src.logger import get_logger
 from src.custom_exception import CustomException
+from src.tracing import traced
+from src.columnar_io import read_frame
 from config.paths_config import *
 
 
 logger = get_logger(__name__)
 
+# Raw columns used by preprocessing; everything else is never read from the artifacts.
+PROCESSING_COLUMNS = ['PassengerId', 'Survived', 'Pclass', 'Name', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Cabin', 'Embarked']
+
+# Fixed encoding so that incremental batches are coded exactly like full loads.
+EMBARKED_CODES = {'C': 0, 'Q': 1, 'S': 2}
+
+
+def engineer_features(df, stats):
+    """
+    Impute and engineer the model features of raw passenger rows, in place.
+
+    Shared by DataProcessor and offline batch scoring, so both produce identical features.
+
+    Args:
+        df (pd.DataFrame): Raw rows with the PROCESSING_COLUMNS (Survived optional).
+        stats (dict): Fill values for Age, Fare and Embarked from the last full load.
+
+    Returns:
+        pd.DataFrame: ``df`` with the FEATURE_COLUMNS added or encoded.
+    """
+    df['Age'] = df['Age'].fillna(stats['Age'])
+    df['Embarked'] = df['Embarked'].fillna(stats['Embarked'])
+    df['Fare'] = df['Fare'].fillna(stats['Fare'])
+    df['Sex'] = df['Sex'].map({'male': 0, 'female': 1})
+    df['Embarked'] = df['Embarked'].map(EMBARKED_CODES).fillna(-1).astype(int)
+
+    df['Familysize'] = df['SibSp'] + df['Parch'] + 1
+
+    df['Isalone'] = (df['Familysize'] == 1).astype(int)
+
+    df['HasCabin'] = df['Cabin'].notnull().astype(int)
+
+    df['Title'] = df['Name'].str.extract(' ([A-Za-z]+)\.', expand=False).map(
+        {'Mr': 0, 'Miss': 1, 'Mrs': 2, 'Master': 3, 'Rare': 4}
+    ).fillna(4)
+
+    df['Pclass_Fare'] = df['Pclass'] * df['Fare']
+    df['Age_Fare'] = df['Age'] * df['Fare']
+
+    return df
+
+
 class DataProcessor:
-    def __init__(self, train_data_path, test_data_path, feature_store: FeatureStore):
+    def __init__(self, train_data_path, test_data_path, feature_store: FeatureStore,
+                 incremental=False, imputation_stats_path=IMPUTATION_STATS_PATH):
         
         self.train_data_path = train_data_path
         self.test_data_path = test_data_path
         self.feature_store = feature_store
+        self.incremental = incremental
+        self.imputation_stats_path = imputation_stats_path
         
         self.data = None 
         self.test_data = None
@@ -25,39 +71,41 @@ class DataProcessor:
         self.X_test = None
         self.y_test = None
 
-        self.X_resampled = None
-        self.y_resampled = None
-
+    @traced()
     def load_data(self):
         try:
-            self.data = pd.read_csv(self.train_data_path)
-            self.test_data = pd.read_csv(self.test_data_path)
+            self.data = read_frame(self.train_data_path, columns=PROCESSING_COLUMNS)
+            self.test_data = read_frame(self.test_data_path, columns=PROCESSING_COLUMNS)
             logger.info("Data loaded successfully.")
         except Exception as e:
             logger.error(f"Error while loading data: {e}")
             raise CustomException(f"Error while loading data: {e}")
         
+    def compute_imputation_stats(self):
+        """Compute fill values on a full load and persist them for later incremental runs."""
+        stats = {
+            'Age': float(self.data['Age'].median()),
+            'Fare': float(self.data['Fare'].median()),
+            'Embarked': str(self.data['Embarked'].mode()[0])
+        }
+        os.makedirs(os.path.dirname(self.imputation_stats_path), exist_ok=True)
+        with open(self.imputation_stats_path, 'w') as file:
+            json.dump(stats, file)
+        return stats
+
+    def load_imputation_stats(self):
+        """Load the fill values of the last full load, so a delta is imputed like the full table."""
+        if not os.path.exists(self.imputation_stats_path):
+            raise FileNotFoundError(f"Imputation stats not found at {self.imputation_stats_path}. Run a full load first.")
+        with open(self.imputation_stats_path) as file:
+            return json.load(file)
+
+    @traced()
     def preprocess_data(self):
         try:
-            self.data['Age'] = self.data['Age'].fillna(self.data['Age'].median())
-            self.data['Embarked'] = self.data['Embarked'].fillna(self.data['Embarked'].mode()[0])
-            self.data['Fare'] = self.data['Fare'].fillna(self.data['Fare'].median())
-            self.data['Sex'] = self.data['Sex'].map({'male': 0, 'female': 1})
-            self.data['Embarked'] = self.data['Embarked'].astype('category').cat.codes
-
-
-            self.data['Familysize'] = self.data['SibSp'] + self.data['Parch'] + 1
-
-            self.data['Isalone'] = (self.data['Familysize'] == 1).astype(int)
+            stats = self.load_imputation_stats() if self.incremental else self.compute_imputation_stats()
 
-            self.data['HasCabin'] = self.data['Cabin'].notnull().astype(int)
-
-            self.data['Title'] = self.data['Name'].str.extract(' ([A-Za-z]+)\.', expand=False).map(
-                {'Mr': 0, 'Miss': 1, 'Mrs': 2, 'Master': 3, 'Rare': 4}
-            ).fillna(4)
-
-            self.data['Pclass_Fare'] = self.data['Pclass'] * self.data['Fare']
-            self.data['Age_Fare'] = self.data['Age'] * self.data['Fare']
+            self.data = engineer_features(self.data, stats)
 
             logger.info("Data Preprocessing done...")
 
@@ -65,20 +113,7 @@ class DataProcessor:
             logger.error(f"Error while preprocessing data {e}")
             raise CustomException(str(e),sys)
         
-    def handle_imbalance_data(self):
-        try:
-            X = self.data[['Pclass', 'Sex', 'Age', 'Fare', 'Embarked', 'Familysize', 'Isalone', 'HasCabin', 'Title', 'Pclass_Fare', 'Age_Fare']]
-            y = self.data['Survived']
-
-            smote = SMOTE(random_state=42)
-            self.X_resampled, self.y_resampled = smote.fit_resample(X, y)
-
-            logger.info("Hanled imbalance data sucesfully...")
-
-        except Exception as e:
-            logger.error(f"Error while handling imabalanced data {e}")
-            raise CustomException(str(e),sys)
-        
+    @traced()
     def store_feature_in_redis(self):
         try:
             batch_data = {}
@@ -99,10 +134,14 @@ class DataProcessor:
                     "Survived": row['Survived']
                 }
                 batch_data[entity_id] = features
-            self.feature_store.store_batch_features(batch_data)
-            logger.info("Stored features in Redis successfully.")
+            if self.incremental:
+                self.feature_store.store_batch_features(batch_data)
+                logger.info(f"Upserted features for {len(batch_data)} entities in the feature store successfully.")
+            else:
+                version = self.feature_store.load_snapshot(batch_data)
+                logger.info(f"Stored features for {len(batch_data)} entities in feature store snapshot {version} successfully.")
         except Exception as e:
-            logger.error(f"Error while storing features in Redis: {e}")
+            logger.error(f"Error while storing features in the feature store: {e}")
             raise CustomException(str(e),sys)
     
     def retrieve_features(self, entity_id):
@@ -112,12 +151,12 @@ class DataProcessor:
         else:
             return None
         
+    @traced()
     def run(self):
         try:
             logger.info("Starting data processing...")
             self.load_data()
             self.preprocess_data()
-            self.handle_imbalance_data()
             self.store_feature_in_redis()
             logger.info("Data processing completed successfully.")
 
@@ -126,8 +165,8 @@ class DataProcessor:
             raise CustomException(str(e),sys)
         
 if __name__ == "__main__":
-    feature_store = FeatureStore()
-    data_processor = DataProcessor(TRAIN_PATH, TEST_PATH, feature_store)
+    feature_store = create_feature_store()
+    data_processor = DataProcessor(TRAIN_ARTIFACT_PATH, TEST_ARTIFACT_PATH, feature_store)
     data_processor.run()
 
     print(data_processor.retrieve_features(332))
\ No newline at end of file
@@ -1,36 +1,387 @@
 import redis
 import json
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+from src.hash_ring import HashRing
+from src.tracing import traced
+from config.redis_config import REDIS_CONFIG
+from config.feature_config import FEATURE_STORE_BACKEND
+
+# Pointer to the live snapshot and registry of published snapshots (scored by publish time).
+LIVE_SNAPSHOT_KEY = "feature_store:live_snapshot"
+SNAPSHOT_REGISTRY_KEY = "feature_store:snapshots"
+# Per-entity keyspaces, sharded by entity id.
+ENTITY_KEY_PATTERNS = ("entity:*", "snapshot:*", "prediction:*")
+REDIS_SPAN_ATTRIBUTES = {"feature_store.backend": "redis"}
+
+
+def entity_id_from_key(key):
+    """Entity id of a ``prediction:{id}``, ``entity:{id}:features`` or snapshot entity key."""
+    if key.startswith("prediction:"):
+        return key.split(":", 1)[1]
+    return key.split(":")[-2]
 
 
 class FeatureStore:
-    
-    def __init__(self, host='localhost', port=6379, db=0):
-        self.client = redis.StrictRedis(host=host, port=port, db=db, decode_responses=True)
+    """
+    Redis-backed feature store.
+
+    Bulk reloads go through versioned snapshots: ``load_snapshot`` writes every entity
+    into a fresh ``snapshot:{version}:`` keyspace with pipelined writes, then flips the
+    live pointer in a single SET, so readers see either the previous snapshot or the
+    new one and never a half-written refresh. Superseded snapshots, and entities that
+    disappeared from the source with them, are deleted by a background collector.
+    Before the first snapshot is published, the legacy ``entity:{id}:features`` keys
+    are used.
+
+    Each client is backed by a bounded, thread-safe connection pool configured from
+    ``REDIS_CONFIG`` (overridable per argument), with socket timeouts, keepalive,
+    periodic health checks and exponential-backoff retries, so one FeatureStore can
+    be shared by all worker threads and a slow Redis fails fast instead of stalling them.
+
+    Entities can be spread over several Redis nodes (``nodes`` or ``REDIS_NODES``): every
+    key of an entity lives on the node that owns its id on a consistent hash ring, and
+    batch reads and writes are grouped per node and issued to the nodes in parallel.
+    The snapshot pointer and registry live on the first node. ``add_node`` and
+    ``remove_node`` move the entities whose owner changed. Ready-made clients (e.g.
+    fakeredis instances) can be passed as ``clients`` instead of node addresses.
+    """
+
+    def __init__(self, host=None, port=None, db=None, write_batch_size=1000, snapshot_cache_seconds=1.0,
+                 keep_snapshots=2, redis_config=REDIS_CONFIG, nodes=None, clients=None):
+        config = dict(redis_config)
+        config.update({key: value for key, value in (('host', host), ('port', port), ('db', db)) if value is not None})
+        self.config = config
+        self.pools = {}
+        if clients is not None:
+            self.shards = dict(clients)
+        else:
+            if nodes is None:
+                nodes = config['nodes'] if host is None and port is None and config.get('nodes') else [f"{config['host']}:{config['port']}"]
+            self.shards = {node: self._connect(node) for node in nodes}
+        if not self.shards:
+            raise ValueError("FeatureStore needs at least one Redis node")
+        self.metadata_node = next(iter(self.shards))
+        self.client = self.shards[self.metadata_node]
+        self.ring = HashRing(self.shards, vnodes=config.get('vnodes', 160))
+        self._executor = None
+        self._executor_workers = 0
+        self._executor_lock = threading.Lock()
+        self.write_batch_size = write_batch_size
+        # Readers cache the live pointer briefly; the previous snapshot is always kept, so
+        # a reader holding a just-superseded pointer still reads a complete snapshot.
+        self.snapshot_cache_seconds = snapshot_cache_seconds
+        self.keep_snapshots = max(2, keep_snapshots)
+        self._snapshot_cache = None
+
+    def _connect(self, node):
+        host, _, port = node.rpartition(":")
+        config = self.config
+        pool = redis.BlockingConnectionPool(
+            host=host,
+            port=int(port),
+            db=config['db'],
+            max_connections=config['max_connections'],
+            timeout=config['pool_timeout'],
+            socket_connect_timeout=config['socket_connect_timeout'],
+            socket_timeout=config['socket_timeout'],
+            socket_keepalive=config['socket_keepalive'],
+            health_check_interval=config['health_check_interval'],
+            retry=Retry(ExponentialBackoff(cap=config['backoff_cap'], base=config['backoff_base']), config['retries']),
+            retry_on_error=[redis.exceptions.ConnectionError, redis.exceptions.TimeoutError],
+            decode_responses=True
+        )
+        self.pools[node] = pool
+        return redis.StrictRedis(connection_pool=pool)
+
+    def pool_stats(self):
+        """Connections of the pools by state, summed over nodes, for monitoring pool saturation."""
+        stats = {'max': 0, 'created': 0, 'in_use': 0, 'idle': 0}
+        for pool in list(self.pools.values()):
+            created = len(pool._connections)
+            idle = sum(1 for connection in list(pool.pool.queue) if connection is not None)
+            stats['max'] += pool.max_connections
+            stats['created'] += created
+            stats['in_use'] += created - idle
+            stats['idle'] += idle
+        return stats
+
+    def client_for(self, entity_id):
+        return self.shards[self.ring.get_node(str(entity_id))]
 
+    def _group_by_node(self, items, ring=None):
+        """Group ``(entity_id, payload)`` pairs by owning node, preserving order within a node."""
+        ring = ring or self.ring
+        grouped = {}
+        for entity_id, payload in items:
+            grouped.setdefault(ring.get_node(str(entity_id)), []).append(payload)
+        return grouped
+
+    def _map_nodes(self, func, grouped):
+        """Run ``func(client, payload)`` for each node of ``grouped``, in parallel when several nodes are involved."""
+        if len(grouped) <= 1:
+            return {node: func(self.shards[node], payload) for node, payload in grouped.items()}
+        with self._executor_lock:
+            if self._executor is None or self._executor_workers < len(self.shards):
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor_workers = len(self.shards)
+                self._executor = ThreadPoolExecutor(max_workers=self._executor_workers, thread_name_prefix="feature-store-shard")
+            executor = self._executor
+        futures = {node: executor.submit(func, self.shards[node], payload) for node, payload in grouped.items()}
+        return {node: future.result() for node, future in futures.items()}
+
+    def live_snapshot(self, refresh=False):
+        now = time.monotonic()
+        if refresh or self._snapshot_cache is None or now - self._snapshot_cache[1] > self.snapshot_cache_seconds:
+            self._snapshot_cache = (self.client.get(LIVE_SNAPSHOT_KEY), now)
+        return self._snapshot_cache[0]
+
+    @staticmethod
+    def entity_key(entity_id, snapshot=None):
+        if snapshot is None:
+            return f"entity:{entity_id}:features"
+        return f"snapshot:{snapshot}:entity:{entity_id}:features"
+
+    @traced("feature_store.store_features", REDIS_SPAN_ATTRIBUTES)
     def store_features(self, entity_id, features):
-        key = f"entity:{entity_id}:features"
-        self.client.set(key, json.dumps(features))
+        key = self.entity_key(entity_id, self.live_snapshot())
+        self.client_for(entity_id).set(key, json.dumps(features))
 
+    @traced("feature_store.get_features", REDIS_SPAN_ATTRIBUTES)
     def get_features(self, entity_id):
-        key = f"entity:{entity_id}:features"
-        features = self.client.get(key)
+        key = self.entity_key(entity_id, self.live_snapshot())
+        features = self.client_for(entity_id).get(key)
         if features:
             return json.loads(features)
         else:
             return None
-        
+
+    def _set_pipelined(self, client, items):
+        """SET serialized ``(key, value)`` pairs in non-transactional pipelines of ``write_batch_size`` commands."""
+        for start in range(0, len(items), self.write_batch_size):
+            pipe = client.pipeline(transaction=False)
+            for key, value in items[start:start + self.write_batch_size]:
+                pipe.set(key, value)
+            pipe.execute()
+
+    def _pipelined_set(self, items):
+        """SET ``(entity_id, key, value)`` triples, pipelined per node and written to the nodes in parallel."""
+        grouped = self._group_by_node((entity_id, (key, json.dumps(value))) for entity_id, key, value in items)
+        self._map_nodes(self._set_pipelined, grouped)
+
+    def _write_batch(self, batch_data, snapshot):
+        self._pipelined_set((entity_id, self.entity_key(entity_id, snapshot), features)
+                            for entity_id, features in batch_data.items())
+
+    @traced("feature_store.store_batch_features", REDIS_SPAN_ATTRIBUTES)
     def store_batch_features(self, batch_data):
-        for entity_id, features in batch_data.items():
-            self.store_features(entity_id, features)
+        """Upsert entities into the live snapshot (or the legacy keyspace before the first snapshot)."""
+        self._write_batch(batch_data, self.live_snapshot(refresh=True))
+
+    @traced("feature_store.load_snapshot", REDIS_SPAN_ATTRIBUTES)
+    def load_snapshot(self, batch_data, background_gc=True):
+        """
+        Bulk load ``batch_data`` as a new snapshot and make it live atomically.
+
+        Returns:
+            str: The version of the published snapshot.
+        """
+        version = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        self._write_batch(batch_data, version)
+        self.publish_snapshot(version)
+        self.collect_garbage(background=background_gc)
+        return version
+
+    def publish_snapshot(self, version):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zadd(SNAPSHOT_REGISTRY_KEY, {version: time.time()})
+        pipe.set(LIVE_SNAPSHOT_KEY, version)
+        pipe.execute()
+        self._snapshot_cache = (version, time.monotonic())
 
+    def _delete_matching(self, pattern):
+        def delete(client, pattern):
+            batch = []
+            for key in client.scan_iter(pattern, count=self.write_batch_size):
+                batch.append(key)
+                if len(batch) >= self.write_batch_size:
+                    client.unlink(*batch)
+                    batch = []
+            if batch:
+                client.unlink(*batch)
+
+        self._map_nodes(delete, {node: pattern for node in self.shards})
+
+    @traced("feature_store.collect_garbage", REDIS_SPAN_ATTRIBUTES)
+    def collect_garbage(self, background=True):
+        """
+        Delete all but the ``keep_snapshots`` newest snapshots, never touching the live one.
+
+        The legacy keyspace is dropped once a second snapshot has been published, so any
+        reader still caching the pre-snapshot pointer has long moved on.
+
+        Returns:
+            threading.Thread or None: The collector thread when running in the background.
+        """
+        versions = self.client.zrange(SNAPSHOT_REGISTRY_KEY, 0, -1)
+        live = self.live_snapshot(refresh=True)
+        stale = [version for version in versions[:-self.keep_snapshots] if version != live]
+        drop_legacy = len(versions) >= 2
+
+        def collect():
+            for version in stale:
+                self._delete_matching(f"snapshot:{version}:*")
+                self.client.zrem(SNAPSHOT_REGISTRY_KEY, version)
+            if drop_legacy:
+                self._delete_matching(self.entity_key("*"))
+
+        if not background:
+            collect()
+            return None
+        thread = threading.Thread(target=collect, name="feature-store-gc", daemon=True)
+        thread.start()
+        return thread
+
+    @traced("feature_store.store_batch_predictions", REDIS_SPAN_ATTRIBUTES)
+    def store_batch_predictions(self, predictions):
+        """Write materialized predictions, one ``prediction:{id}`` key per entity."""
+        self._pipelined_set((entity_id, f"prediction:{entity_id}", prediction)
+                            for entity_id, prediction in predictions.items())
+
+    @traced("feature_store.get_prediction", REDIS_SPAN_ATTRIBUTES)
+    def get_prediction(self, entity_id):
+        prediction = self.client_for(entity_id).get(f"prediction:{entity_id}")
+        return json.loads(prediction) if prediction else None
+
+    @traced("feature_store.get_batch_features", REDIS_SPAN_ATTRIBUTES)
     def get_batch_features(self, entity_ids):
-        batch_features = {}
-        for entity_id in entity_ids:
-            batch_features[entity_id] = self.get_features(entity_id)
-        return batch_features
-    
+        entity_ids = list(entity_ids)
+        if not entity_ids:
+            return {}
+        snapshot = self.live_snapshot()
+        grouped = self._group_by_node((entity_id, entity_id) for entity_id in entity_ids)
+        results = self._map_nodes(lambda client, ids: self._mget_chunked(client, ids, snapshot), grouped)
+        values = {entity_id: value for node_results in results.values() for entity_id, value in node_results}
+        return {entity_id: json.loads(values[entity_id]) if values[entity_id] else None for entity_id in entity_ids}
+
+    def _mget_chunked(self, client, entity_ids, snapshot):
+        """MGET ``entity_ids`` in chunks of ``write_batch_size``, so no single call outlasts the socket timeout."""
+        pairs = []
+        for start in range(0, len(entity_ids), self.write_batch_size):
+            chunk = entity_ids[start:start + self.write_batch_size]
+            pairs.extend(zip(chunk, client.mget([self.entity_key(entity_id, snapshot) for entity_id in chunk])))
+        return pairs
+
+    @traced("feature_store.get_all_entity_ids", REDIS_SPAN_ATTRIBUTES)
     def get_all_entity_ids(self):
-        keys = self.client.keys("entity:*:features")
-        entity_ids = [key.split(":")[1] for key in keys]
-        return entity_ids
+        """All entity ids of the live snapshot, collected with SCAN so no single call blocks a node."""
+        # SCAN may return a key more than once; dict.fromkeys drops repeats and keeps scan order.
+        return list(dict.fromkeys(entity_id for batch in self.iter_entity_ids(self.write_batch_size)
+                                  for entity_id in batch))
+
+    def iter_entity_ids(self, batch_size=1000):
+        """
+        Yield entity ids in batches with SCAN over each node, without materialising the full id list.
+        SCAN may return a key more than once, so callers that count entities must deduplicate.
+        """
+        pattern = self.entity_key("*", self.live_snapshot(refresh=True))
+        batch = []
+        for client in list(self.shards.values()):
+            for key in client.scan_iter(pattern, count=batch_size):
+                batch.append(key.split(":")[-2])
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def has_features(self):
+        pattern = self.entity_key("*", self.live_snapshot())
+        return any(next(client.scan_iter(pattern, count=100), None) is not None for client in self.shards.values())
+
+    @traced("feature_store.add_node", REDIS_SPAN_ATTRIBUTES)
+    def add_node(self, node, client=None):
+        """
+        Add a node to the ring and move over the entities it now owns.
+
+        Returns:
+            int: Number of keys moved.
+        """
+        if node in self.shards:
+            raise ValueError(f"Node {node} is already part of the feature store")
+        ring = self.ring.copy()
+        ring.add_node(node)
+        self.shards[node] = client if client is not None else self._connect(node)
+        return self._rebalance(ring)
+
+    @traced("feature_store.remove_node", REDIS_SPAN_ATTRIBUTES)
+    def remove_node(self, node):
+        """
+        Move the entities of ``node`` to their new owners and drop it from the ring.
+        The metadata node holding the snapshot pointer cannot be removed.
+
+        Returns:
+            int: Number of keys moved.
+        """
+        if node == self.metadata_node:
+            raise ValueError(f"Node {node} holds the snapshot metadata and cannot be removed")
+        ring = self.ring.copy()
+        ring.remove_node(node)
+        moved = self._rebalance(ring)
+        del self.shards[node]
+        pool = self.pools.pop(node, None)
+        if pool is not None:
+            pool.disconnect()
+        return moved
+
+    def _rebalance(self, ring):
+        """
+        Copy every entity key whose owner differs under ``ring`` to its new node, switch to
+        ``ring``, then delete the copied keys from their old nodes. Readers keep finding
+        every key on the current ring until the switch; writes racing the rebalance may be
+        lost, so run it between loads.
+        """
+        moves = {}
+        for node, client in self.shards.items():
+            for pattern in ENTITY_KEY_PATTERNS:
+                for key in client.scan_iter(pattern, count=self.write_batch_size):
+                    owner = ring.get_node(entity_id_from_key(key))
+                    if owner != node:
+                        moves.setdefault(node, []).append((key, owner))
+
+        for node, keys in moves.items():
+            source = self.shards[node]
+            for start in range(0, len(keys), self.write_batch_size):
+                batch = keys[start:start + self.write_batch_size]
+                values = source.mget([key for key, _ in batch])
+                grouped = {}
+                for (key, owner), value in zip(batch, values):
+                    if value is not None:
+                        grouped.setdefault(owner, []).append((key, value))
+                self._map_nodes(self._set_pipelined, grouped)
+
+        self.ring = ring
+        for node, keys in moves.items():
+            source = self.shards[node]
+            for start in range(0, len(keys), self.write_batch_size):
+                source.unlink(*[key for key, _ in keys[start:start + self.write_batch_size]])
+        return sum(len(keys) for keys in moves.values())
+
 
+def create_feature_store(backend=None, **kwargs):
+    """
+    Feature store for the configured backend: ``FeatureStore`` for "redis" (the default)
+    or ``LocalFeatureStore`` for "local". Keyword arguments go to the backend constructor.
+    """
+    backend = backend or FEATURE_STORE_BACKEND
+    if backend == "redis":
+        return FeatureStore(**kwargs)
+    if backend == "local":
+        from src.local_feature_store import LocalFeatureStore
+        return LocalFeatureStore(**kwargs)
+    raise ValueError(f"Unknown feature store backend {backend}, expected 'redis' or 'local'")
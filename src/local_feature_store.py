@@ -0,0 +1,411 @@
+"""
+Local Feature Store Module
+
+Embedded feature store backend for single-node serving, exposing the same API as the
+Redis ``FeatureStore``. Each snapshot is a directory holding a sorted ``int64`` id
+column, a fixed-width ``float64`` feature matrix stored column by column and a
+predictions matrix, all ``.npy`` files opened memory-mapped. Lookups are a binary
+search over the id column plus a row read, with no network round trip, and worker
+processes mapping the same files share one copy in the page cache.
+
+Snapshots are immutable and published like Redis snapshots: a new version directory
+is written, then the ``CURRENT`` pointer file is replaced atomically; readers pick up
+the new version on their next pointer check. Incremental upserts merge the delta into
+a new snapshot with vectorized ``searchsorted`` lookups, streaming the previous columns
+from their memory maps.
+
+Usage:
+    python -m src.local_feature_store artifacts/feature_store   # build from the live Redis snapshot
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import numbers
+import argparse
+import threading
+from datetime import datetime
+import numpy as np
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.tracing import traced
+from config.paths_config import LOCAL_FEATURE_STORE_DIR
+
+logger = get_logger(__name__)
+
+CURRENT_FILE = "CURRENT"
+# Numeric prediction fields kept per row; string fields (model version, timestamp) are
+# shared by a whole materialization run and kept once per snapshot.
+PREDICTION_COLUMNS = ('survived', 'survival_probability')
+LOCAL_SPAN_ATTRIBUTES = {"feature_store.backend": "local"}
+
+
+def _entity_id(entity_id):
+    """Integer id of an entity given as int, float or string, None if it is not numeric."""
+    try:
+        return int(entity_id)
+    except (TypeError, ValueError):
+        try:
+            return int(float(entity_id))
+        except (TypeError, ValueError):
+            return None
+
+
+class LocalFeatureStore:
+
+    def __init__(self, store_dir=LOCAL_FEATURE_STORE_DIR, snapshot_cache_seconds=1.0, keep_snapshots=2):
+        self.store_dir = store_dir
+        self.snapshot_cache_seconds = snapshot_cache_seconds
+        self.keep_snapshots = max(2, keep_snapshots)
+        self.lock = threading.Lock()
+        self._snapshot_cache = None
+        self._loaded = None
+        os.makedirs(store_dir, exist_ok=True)
+
+    def pool_stats(self):
+        """No connections are used; kept for API parity with the Redis backend."""
+        return {'max': 0, 'created': 0, 'in_use': 0, 'idle': 0}
+
+    def _snapshot_dir(self, version):
+        return os.path.join(self.store_dir, version)
+
+    def live_snapshot(self, refresh=False):
+        now = time.monotonic()
+        if refresh or self._snapshot_cache is None or now - self._snapshot_cache[1] > self.snapshot_cache_seconds:
+            try:
+                with open(os.path.join(self.store_dir, CURRENT_FILE)) as file:
+                    version = file.read().strip() or None
+            except FileNotFoundError:
+                version = None
+            self._snapshot_cache = (version, now)
+        return self._snapshot_cache[0]
+
+    def _snapshot(self, refresh=False):
+        """Memory-mapped arrays of the live snapshot, reopened when the pointer moves."""
+        version = self.live_snapshot(refresh)
+        with self.lock:
+            if version is None:
+                self._loaded = None
+            elif self._loaded is None or self._loaded['version'] != version:
+                path = self._snapshot_dir(version)
+                with open(os.path.join(path, "manifest.json")) as file:
+                    manifest = json.load(file)
+                self._loaded = {
+                    'version': version,
+                    'columns': manifest['columns'],
+                    'int_columns': set(manifest['int_columns']),
+                    'ids': np.load(os.path.join(path, "ids.npy"), mmap_mode='r'),
+                    'features': np.load(os.path.join(path, "features.npy"), mmap_mode='r'),
+                    'predictions': np.load(os.path.join(path, "predictions.npy"), mmap_mode='r'),
+                    'predictions_file': os.path.join(path, "predictions.npy"),
+                    'predictions_path': os.path.join(path, "predictions.json"),
+                    'prediction_meta': None
+                }
+            return self._loaded
+
+    @staticmethod
+    def _rows(snapshot, entity_ids):
+        """Row index per entity id, -1 for unknown ids."""
+        ids = snapshot['ids']
+        rows = np.full(len(entity_ids), -1, dtype=np.int64)
+        if not len(ids):
+            return rows
+        lookup = [_entity_id(entity_id) for entity_id in entity_ids]
+        known = np.array([entity_id is not None for entity_id in lookup], dtype=bool)
+        keys = np.array([entity_id if entity_id is not None else 0 for entity_id in lookup], dtype=np.int64)
+        positions = np.minimum(np.searchsorted(ids, keys), len(ids) - 1)
+        found = known & (ids[positions] == keys)
+        rows[found] = positions[found]
+        return rows
+
+    @staticmethod
+    def _row(snapshot, entity_id):
+        """Row index of a single entity id, -1 if unknown; avoids the array setup of ``_rows``."""
+        ids = snapshot['ids']
+        key = _entity_id(entity_id)
+        if key is None or not len(ids):
+            return -1
+        position = int(ids.searchsorted(key))
+        return position if position < len(ids) and ids[position] == key else -1
+
+    @staticmethod
+    def _to_dict(snapshot, values):
+        features = {}
+        for column, value in zip(snapshot['columns'], values.tolist()):
+            if value != value:
+                features[column] = None
+            elif column in snapshot['int_columns']:
+                features[column] = int(value)
+            else:
+                features[column] = value
+        return features
+
+    @traced("feature_store.get_features", LOCAL_SPAN_ATTRIBUTES)
+    def get_features(self, entity_id):
+        snapshot = self._snapshot()
+        row = -1 if snapshot is None else self._row(snapshot, entity_id)
+        return None if row < 0 else self._to_dict(snapshot, snapshot['features'][row])
+
+    @traced("feature_store.get_batch_features", LOCAL_SPAN_ATTRIBUTES)
+    def get_batch_features(self, entity_ids):
+        entity_ids = list(entity_ids)
+        snapshot = self._snapshot()
+        if not entity_ids:
+            return {}
+        if snapshot is None:
+            return {entity_id: None for entity_id in entity_ids}
+        rows = self._rows(snapshot, entity_ids)
+        matrix = snapshot['features'][rows[rows >= 0]]
+        result, position = {}, 0
+        for entity_id, row in zip(entity_ids, rows):
+            if row < 0:
+                result[entity_id] = None
+            else:
+                result[entity_id] = self._to_dict(snapshot, matrix[position])
+                position += 1
+        return result
+
+    @traced("feature_store.get_all_entity_ids", LOCAL_SPAN_ATTRIBUTES)
+    def get_all_entity_ids(self):
+        snapshot = self._snapshot()
+        return [] if snapshot is None else [str(entity_id) for entity_id in snapshot['ids'].tolist()]
+
+    def iter_entity_ids(self, batch_size=1000):
+        snapshot = self._snapshot(refresh=True)
+        if snapshot is None:
+            return
+        for start in range(0, len(snapshot['ids']), batch_size):
+            yield [str(entity_id) for entity_id in snapshot['ids'][start:start + batch_size].tolist()]
+
+    def has_features(self):
+        snapshot = self._snapshot()
+        return snapshot is not None and len(snapshot['ids']) > 0
+
+    @traced("feature_store.store_features", LOCAL_SPAN_ATTRIBUTES)
+    def store_features(self, entity_id, features):
+        self.store_batch_features({entity_id: features})
+
+    @staticmethod
+    def _encode(batch_data):
+        """Sorted int64 ids, column names, integer columns and column-major feature matrix of ``batch_data``."""
+        items = sorted({_entity_id(entity_id): features for entity_id, features in batch_data.items()}.items())
+        columns = list(dict.fromkeys(column for _, features in items for column in features))
+        int_columns = [
+            column for column in columns
+            if all(isinstance(features.get(column), numbers.Integral) for _, features in items
+                   if features.get(column) is not None)
+        ]
+        ids = np.array([entity_id for entity_id, _ in items], dtype=np.int64)
+        # Column-major, so each feature column is contiguous on disk.
+        features = np.full((len(items), len(columns)), np.nan, dtype=np.float64, order='F')
+        for row, (_, values) in enumerate(items):
+            for position, column in enumerate(columns):
+                value = values.get(column)
+                if value is not None:
+                    features[row, position] = value
+        return ids, columns, int_columns, features
+
+    def _write_snapshot(self, ids, columns, int_columns, features, predictions, prediction_meta, background_gc):
+        """Write the arrays of a new snapshot not yet on disk, publish it and collect old ones."""
+        version, path = self._new_snapshot()
+        np.save(os.path.join(path, "ids.npy"), ids)
+        np.save(os.path.join(path, "features.npy"), features)
+        np.save(os.path.join(path, "predictions.npy"), predictions)
+        return self._publish(version, path, columns, int_columns, len(ids), prediction_meta, background_gc)
+
+    def _new_snapshot(self):
+        version = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        path = self._snapshot_dir(version)
+        os.makedirs(path)
+        return version, path
+
+    def _publish(self, version, path, columns, int_columns, n_rows, prediction_meta, background_gc):
+        with open(os.path.join(path, "predictions.json"), 'w') as file:
+            json.dump(prediction_meta, file)
+        with open(os.path.join(path, "manifest.json"), 'w') as file:
+            json.dump({'columns': columns, 'int_columns': int_columns, 'rows': n_rows}, file)
+        self.publish_snapshot(version)
+        self.collect_garbage(background=background_gc)
+        return version
+
+    @staticmethod
+    def _prediction_meta_of(snapshot):
+        if snapshot is None or not os.path.exists(snapshot['predictions_path']):
+            return {}
+        with open(snapshot['predictions_path']) as file:
+            return json.load(file)
+
+    @traced("feature_store.store_batch_features", LOCAL_SPAN_ATTRIBUTES)
+    def store_batch_features(self, batch_data, background_gc=True):
+        """
+        Upsert entities by publishing a new snapshot with the merged rows.
+
+        Only the delta is converted from Python objects; the live snapshot is merged in
+        with ``searchsorted`` one column at a time into memory-mapped output files, so an
+        upsert copies the store once on disk but never holds it in memory.
+        """
+        previous = self._snapshot(refresh=True)
+        if previous is None or not len(previous['ids']):
+            return self.load_snapshot(batch_data, background_gc=background_gc)
+
+        delta_ids, delta_columns, delta_int_columns, delta_features = self._encode(batch_data)
+        columns = previous['columns'] + [column for column in delta_columns if column not in previous['columns']]
+        delta_positions = {column: position for position, column in enumerate(delta_columns)}
+        # A column stays integral only if both the snapshot and the delta hold integers in it.
+        int_columns = [column for column in columns
+                       if (column in previous['int_columns'] or column not in previous['columns'])
+                       and (column not in delta_positions or column in delta_int_columns)]
+
+        previous_ids = previous['ids']
+        ids = np.union1d(previous_ids, delta_ids)
+        previous_rows = np.searchsorted(ids, previous_ids)
+        delta_rows = np.searchsorted(ids, delta_ids)
+
+        version, path = self._new_snapshot()
+        np.save(os.path.join(path, "ids.npy"), ids)
+        features = np.lib.format.open_memmap(os.path.join(path, "features.npy"), mode='w+', dtype=np.float64,
+                                             shape=(len(ids), len(columns)), fortran_order=True)
+        for position, column in enumerate(columns):
+            merged = np.full(len(ids), np.nan)
+            if position < len(previous['columns']):
+                merged[previous_rows] = previous['features'][:, position]
+            # Upserted rows replace the whole entity, as in the Redis backend.
+            merged[delta_rows] = delta_features[:, delta_positions[column]] if column in delta_positions else np.nan
+            features[:, position] = merged
+        features.flush()
+        del features
+
+        predictions = np.full((len(ids), len(PREDICTION_COLUMNS)), np.nan, dtype=np.float64)
+        predictions[previous_rows] = previous['predictions']
+        np.save(os.path.join(path, "predictions.npy"), predictions)
+        return self._publish(version, path, columns, int_columns, len(ids), self._prediction_meta_of(previous),
+                             background_gc)
+
+    @traced("feature_store.load_snapshot", LOCAL_SPAN_ATTRIBUTES)
+    def load_snapshot(self, batch_data, background_gc=True):
+        """
+        Write ``batch_data`` as a new snapshot and make it live atomically. Predictions of
+        entities present in the previous snapshot are carried over.
+
+        Returns:
+            str: The version of the published snapshot.
+        """
+        ids, columns, int_columns, features = self._encode(batch_data)
+        predictions = np.full((len(ids), len(PREDICTION_COLUMNS)), np.nan, dtype=np.float64)
+
+        previous = self._snapshot(refresh=True)
+        if previous is not None and len(ids):
+            previous_rows = self._rows(previous, ids.tolist())
+            carried = previous_rows >= 0
+            predictions[carried] = previous['predictions'][previous_rows[carried]]
+
+        return self._write_snapshot(ids, columns, int_columns, features, predictions,
+                                    self._prediction_meta_of(previous), background_gc)
+
+    def publish_snapshot(self, version):
+        tmp_path = os.path.join(self.store_dir, f"{CURRENT_FILE}.tmp")
+        with open(tmp_path, 'w') as file:
+            file.write(version)
+        os.replace(tmp_path, os.path.join(self.store_dir, CURRENT_FILE))
+        self._snapshot_cache = (version, time.monotonic())
+
+    def collect_garbage(self, background=True):
+        """
+        Delete all but the ``keep_snapshots`` newest snapshot directories. Processes still
+        mapping a deleted snapshot keep reading it until they switch to the live one.
+
+        Returns:
+            threading.Thread or None: The collector thread when running in the background.
+        """
+        live = self.live_snapshot(refresh=True)
+        versions = sorted(name for name in os.listdir(self.store_dir)
+                          if os.path.isdir(self._snapshot_dir(name)))
+        stale = [version for version in versions[:-self.keep_snapshots] if version != live]
+
+        def collect():
+            for version in stale:
+                shutil.rmtree(self._snapshot_dir(version), ignore_errors=True)
+
+        if not background:
+            collect()
+            return None
+        thread = threading.Thread(target=collect, name="local-feature-store-gc", daemon=True)
+        thread.start()
+        return thread
+
+    @traced("feature_store.store_batch_predictions", LOCAL_SPAN_ATTRIBUTES)
+    def store_batch_predictions(self, predictions):
+        """Write materialized predictions in place into the rows of the live snapshot."""
+        snapshot = self._snapshot(refresh=True)
+        if snapshot is None or not predictions:
+            return
+        entity_ids = list(predictions)
+        rows = self._rows(snapshot, entity_ids)
+        missing = int((rows < 0).sum())
+        if missing:
+            logger.warning(f"Skipping predictions for {missing} entities missing from snapshot {snapshot['version']}")
+        # Written through a shared mapping, so readers mapping the file see the rows at once.
+        writable = np.load(snapshot['predictions_file'], mmap_mode='r+')
+        for entity_id, row in zip(entity_ids, rows):
+            if row >= 0:
+                writable[row] = [float(predictions[entity_id][column]) for column in PREDICTION_COLUMNS]
+        writable.flush()
+        del writable
+
+        prediction_meta = {key: value for key, value in predictions[entity_ids[0]].items() if key not in PREDICTION_COLUMNS}
+        tmp_path = f"{snapshot['predictions_path']}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(prediction_meta, file)
+        os.replace(tmp_path, snapshot['predictions_path'])
+
+    def _prediction_meta(self, snapshot):
+        """Shared string fields of the materialized predictions, reread only when the file changes."""
+        mtime = os.stat(snapshot['predictions_path']).st_mtime_ns
+        cached = snapshot['prediction_meta']
+        if cached is None or cached[0] != mtime:
+            with open(snapshot['predictions_path']) as file:
+                cached = snapshot['prediction_meta'] = (mtime, json.load(file))
+        return cached[1]
+
+    @traced("feature_store.get_prediction", LOCAL_SPAN_ATTRIBUTES)
+    def get_prediction(self, entity_id):
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return None
+        row = self._row(snapshot, entity_id)
+        if row < 0:
+            return None
+        survived, probability = snapshot['predictions'][row].tolist()
+        if survived != survived:
+            return None
+        prediction = dict(self._prediction_meta(snapshot))
+        prediction.update({'survived': bool(survived), 'survival_probability': probability})
+        return prediction
+
+    @classmethod
+    def build_from(cls, source, store_dir=LOCAL_FEATURE_STORE_DIR, batch_size=1000):
+        """Build a local store from the live snapshot of another feature store, e.g. Redis."""
+        try:
+            store = cls(store_dir)
+            batch_data = {}
+            for batch in source.iter_entity_ids(batch_size):
+                batch_data.update(source.get_batch_features(batch))
+            version = store.load_snapshot({entity_id: features for entity_id, features in batch_data.items()
+                                           if features is not None}, background_gc=False)
+            logger.info(f"Built local feature store snapshot {version} with {len(batch_data)} entities in {store_dir}")
+            return store
+
+        except Exception as e:
+            logger.error(f"Error while building the local feature store: {e}")
+            raise CustomException(str(e), sys)
+
+
+if __name__ == "__main__":
+    from src.feature_store import FeatureStore
+
+    parser = argparse.ArgumentParser(description="Build the local feature store from the live Redis snapshot.")
+    parser.add_argument("store_dir", nargs="?", default=LOCAL_FEATURE_STORE_DIR)
+    args = parser.parse_args()
+    LocalFeatureStore.build_from(FeatureStore(), args.store_dir)
@@ -11,25 +11,50 @@ Features:
 - Daily log files with date stamps
 - Standardized log format with timestamp, log level, and message
 - Helper function `get_logger` to obtain configured logger instances.
+
+Importing the module has no side effects: logging is configured by the first
+`get_logger` call, and the logs directory and file are only created when the
+first record is written.
 """
 
 import logging
 import os
+import threading
 from datetime import datetime
 
 # Directory to store log files
 LOGS_DIR = "logs"
-os.makedirs(LOGS_DIR, exist_ok=True)
 
 # Create log file with current date in filename
 LOG_FILE = os.path.join(LOGS_DIR, f"log_{datetime.now().strftime('%Y-%m-%d')}.log")
 
-# Configure basic logging settings for the application
-logging.basicConfig(
-    filename=LOG_FILE,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    level = logging.INFO
-)
+_configured = False
+_configure_lock = threading.Lock()
+
+
+class LazyFileHandler(logging.FileHandler):
+    """File handler that creates the log directory and opens the file on the first record."""
+
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+def configure_logging():
+    """Configure basic logging settings for the application, once."""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        logging.basicConfig(
+            handlers=[LazyFileHandler(LOG_FILE)],
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            level = logging.INFO
+        )
+        _configured = True
 
 def get_logger(name):
     """
@@ -50,6 +75,8 @@ def get_logger(name):
         >>> logger = get_logger(__name__)
         >>> logger.info("Processing started")
     """
+    if not _configured:
+        configure_logging()
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
     return logger
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Memory Metrics Module
+
+Prometheus gauges for the serving process footprint: resident set size, the size of
+each artifact held in memory (model, reference matrix, scaler, drift detector), the
+reference-set row count and, when enabled with ``TRACEMALLOC_TOP_N``, the top
+allocation sites reported by tracemalloc at scrape time.
+"""
+
+import os
+import sys
+import pickle
+import tracemalloc
+import psutil
+from prometheus_client import Gauge, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+TRACEMALLOC_TOP_N = int(os.getenv("TRACEMALLOC_TOP_N", "0"))
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "1"))
+
+process_rss_bytes = Gauge('app_process_rss_bytes', 'Resident set size of the serving process')
+artifact_size_bytes = Gauge('app_artifact_size_bytes', 'Approximate in-memory size of loaded artifacts', ['artifact'])
+reference_rows = Gauge('app_reference_rows', 'Rows in the drift detection reference set')
+
+_process = psutil.Process()
+process_rss_bytes.set_function(lambda: _process.memory_info().rss)
+
+
+def estimate_size(obj):
+    """Buffer size for arrays exposing ``nbytes``, serialized size for other picklable objects."""
+    if obj is None:
+        return 0
+    nbytes = getattr(obj, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(obj)
+
+
+def record_artifacts(artifacts, reference_data=None):
+    """
+    Set the artifact size gauges. Called whenever artifacts are (re)loaded, not per scrape,
+    since serializing a large forest is too slow to repeat on every scrape.
+
+    Args:
+        artifacts (dict): Artifact name to loaded object.
+        reference_data (np.ndarray, optional): Drift reference matrix, for the row count gauge.
+    """
+    for name, obj in artifacts.items():
+        artifact_size_bytes.labels(artifact=name).set(estimate_size(obj))
+    reference_rows.set(0 if reference_data is None else len(reference_data))
+    logger.info(f"Recorded artifact sizes for {', '.join(artifacts)}")
+
+
+class TracemallocCollector:
+    """Exports the top ``top_n`` tracemalloc allocation sites as a gauge, computed at scrape time."""
+
+    def __init__(self, top_n):
+        self.top_n = top_n
+
+    def collect(self):
+        gauge = GaugeMetricFamily('app_tracemalloc_top_allocation_bytes',
+                                  'Bytes allocated by the top tracemalloc allocation sites', labels=['location'])
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            for stat in snapshot.statistics('lineno')[:self.top_n]:
+                frame = stat.traceback[0]
+                gauge.add_metric([f"{frame.filename}:{frame.lineno}"], stat.size)
+        yield gauge
+
+
+if TRACEMALLOC_TOP_N > 0:
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    REGISTRY.register(TracemallocCollector(TRACEMALLOC_TOP_N))
+    logger.info(f"tracemalloc enabled, exporting the top {TRACEMALLOC_TOP_N} allocation sites")
@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import pandas as pd
+from datetime import datetime
+from src.feature_store import FeatureStore, create_feature_store
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.tracing import traced
+from config.feature_config import FEATURE_COLUMNS
+from config.paths_config import MODEL_PATH, MODEL_METADATA_PATH
+
+logger = get_logger(__name__)
+
+
+def load_model_version(model_path=MODEL_PATH, metadata_path=MODEL_METADATA_PATH):
+    """Version recorded by ModelTraining.save_model, or the content hash of older pickles without metadata."""
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as file:
+            version = json.load(file).get('version')
+        if version:
+            return version
+    with open(model_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()[:12]
+
+
+@traced()
+def score_features(model, features_by_entity):
+    """
+    Score a batch of feature dicts with one vectorized ``predict_proba`` call.
+
+    Returns:
+        dict: Prediction per entity id; entities without features are left out.
+    """
+    valid = {entity_id: features for entity_id, features in features_by_entity.items() if features is not None}
+    if not valid:
+        return {}
+    features_df = pd.DataFrame.from_dict(valid, orient='index')[FEATURE_COLUMNS]
+    probabilities = model.predict_proba(features_df)[:, 1]
+    return {
+        entity_id: {'survived': bool(probability > 0.5), 'survival_probability': float(probability)}
+        for entity_id, probability in zip(features_df.index, probabilities)
+    }
+
+
+class PredictionMaterializer:
+
+    def __init__(self, feature_store: FeatureStore, model, model_version, chunk_size=1000):
+        self.feature_store = feature_store
+        self.model = model
+        self.model_version = model_version
+        self.chunk_size = chunk_size
+
+    @traced()
+    def run(self):
+        try:
+            logger.info(f"Materializing predictions with model {self.model_version}...")
+            start = time.perf_counter()
+            materialized_at = datetime.now().isoformat()
+            total = 0
+
+            for batch in self.feature_store.iter_entity_ids(self.chunk_size):
+                predictions = score_features(self.model, self.feature_store.get_batch_features(batch))
+                for prediction in predictions.values():
+                    prediction.update({'model_version': self.model_version, 'materialized_at': materialized_at})
+                self.feature_store.store_batch_predictions(predictions)
+                total += len(predictions)
+
+            elapsed = time.perf_counter() - start
+            logger.info(f"Materialized {total} predictions in {elapsed:.2f}s.")
+            return {'predictions': total, 'model_version': self.model_version}
+
+        except Exception as e:
+            logger.error(f"Error while materializing predictions: {e}")
+            raise CustomException(str(e), sys)
+
+
+if __name__ == "__main__":
+    with open(MODEL_PATH, 'rb') as file:
+        model_bytes = file.read()
+    # Version the bytes being materialized, as the app does, in case the pickle was swapped after training.
+    materializer = PredictionMaterializer(create_feature_store(), pickle.loads(model_bytes),
+                                          hashlib.sha256(model_bytes).hexdigest()[:12])
+    materializer.run()
@@ -0,0 +1,169 @@
+"""
+Request Profiling Module
+
+On-demand profiling of live requests. An operator arms the profiler for the next N
+requests and/or a time window; those requests are profiled either with cProfile
+(aggregated into one pstats report) or with a sampling profiler that periodically
+captures the stacks of the threads serving them (reported as flamegraph-compatible
+collapsed stacks). While disarmed, the request hooks only read a single boolean.
+"""
+
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+MODES = ("cprofile", "sample")
+# Shorter sampling intervals would have the sampler compete for the GIL with the profiled requests.
+MIN_SAMPLE_INTERVAL = 0.001
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RequestProfiler:
+
+    def __init__(self):
+        self.active = False
+        self.lock = threading.Lock()
+        self.mode = None
+        self.remaining = None
+        self.deadline = None
+        self.interval = None
+        self.profiled_requests = 0
+        self.stats = None
+        self.samples = Counter()
+        self.in_flight = {}
+        self.sampler = None
+
+    def start(self, requests=None, seconds=None, mode="cprofile", interval=0.005):
+        """
+        Arm the profiler for the next ``requests`` requests and/or ``seconds`` seconds.
+
+        Previous results are discarded. At least one of the limits is required. The
+        sampling ``interval`` must be positive and is raised to ``MIN_SAMPLE_INTERVAL``.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode}, expected one of {MODES}")
+        if requests is None and seconds is None:
+            raise ValueError("Either a request count or a time window is required")
+        if not interval > 0:
+            raise ValueError(f"Sampling interval must be positive, got {interval}")
+        interval = max(interval, MIN_SAMPLE_INTERVAL)
+
+        with self.lock:
+            self.mode = mode
+            self.remaining = requests
+            self.deadline = time.monotonic() + seconds if seconds is not None else None
+            self.interval = interval
+            self.profiled_requests = 0
+            self.stats = None
+            self.samples = Counter()
+            self.in_flight = {}
+            self.active = True
+
+        if mode == "sample" and (self.sampler is None or not self.sampler.is_alive()):
+            self.sampler = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+            self.sampler.start()
+        logger.info(f"Request profiling started: mode={mode}, requests={requests}, seconds={seconds}")
+
+    def status(self):
+        with self.lock:
+            self._expire()
+            return {
+                'active': self.active,
+                'mode': self.mode,
+                'profiled_requests': self.profiled_requests,
+                'remaining_requests': self.remaining,
+                'in_flight': len(self.in_flight)
+            }
+
+    def _expire(self):
+        if self.active and self.deadline is not None and time.monotonic() > self.deadline:
+            self.active = False
+
+    def begin_request(self):
+        """Start profiling the current request if the profiler is armed. Returns a token for ``end_request``."""
+        with self.lock:
+            self._expire()
+            if not self.active:
+                return None
+            if self.remaining is not None:
+                self.remaining -= 1
+                if self.remaining <= 0:
+                    self.active = False
+            self.profiled_requests += 1
+            mode = self.mode
+            thread_id = threading.get_ident()
+            self.in_flight[thread_id] = True
+
+        if mode == "sample":
+            return (mode, thread_id, None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active on this interpreter; skip this request.
+            profile = None
+        return (mode, thread_id, profile)
+
+    def end_request(self, token):
+        mode, thread_id, profile = token
+        if profile is not None:
+            profile.disable()
+        with self.lock:
+            self.in_flight.pop(thread_id, None)
+            if profile is not None:
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+
+    def _sample_loop(self):
+        while True:
+            with self.lock:
+                self._expire()
+                threads = list(self.in_flight)
+                if not self.active and not threads:
+                    break
+            frames = sys._current_frames()
+            for thread_id in threads:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    with self.lock:
+                        self.samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def report(self, fmt="text", limit=50):
+        """
+        Return the collected profile.
+
+        Args:
+            fmt (str): "text" for a cumulative-time pstats listing (cprofile mode) or
+                "collapsed" for collapsed stacks, one ``frame;frame;... count`` per line
+                (sample mode), as consumed by flamegraph.pl or speedscope.
+            limit (int): Number of functions in the text listing.
+        """
+        with self.lock:
+            if fmt == "collapsed":
+                return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+            if self.stats is None:
+                return "No cProfile data collected.\n"
+            output = io.StringIO()
+            stats = pstats.Stats(stream=output)
+            stats.add(self.stats)
+            stats.sort_stats("cumulative").print_stats(limit)
+            return output.getvalue()
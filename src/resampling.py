@@ -0,0 +1,121 @@
+"""
+Resampling Module
+
+Class-imbalance handling for the training set. SMOTE can run with an exact
+k-nearest-neighbour search parallelised across cores, or with an approximate
+partitioned search that splits the rows into random stratified partitions and
+oversamples each one independently in its own worker, trading neighbour
+quality for roughly ``1/n_partitions`` of the neighbour-search cost. Class
+weights can be used instead of resampling altogether.
+"""
+
+import time
+import numpy as np
+import pandas as pd
+import psutil
+from joblib import Parallel, delayed, effective_n_jobs
+from imblearn.over_sampling import SMOTE
+from sklearn.base import BaseEstimator
+from sklearn.neighbors import NearestNeighbors
+from sklearn.utils.class_weight import compute_class_weight
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+STRATEGIES = ("smote", "class_weight", "none")
+NEIGHBOR_SEARCHES = ("exact", "partitioned")
+
+
+def _smote_partition(X, y, k_neighbors, random_state, n_jobs=1):
+    """Oversample one partition. Partitions too small for SMOTE are returned unchanged."""
+    minority = y.value_counts().min()
+    if y.nunique() < 2 or minority < 2:
+        return X, y
+    k = min(k_neighbors, minority - 1)
+    smote = SMOTE(k_neighbors=NearestNeighbors(n_neighbors=k + 1, n_jobs=n_jobs), random_state=random_state)
+    return smote.fit_resample(X, y)
+
+
+class Resampler(BaseEstimator):
+    """
+    Resampling step with the imblearn sampler interface, so it can be cloned into an
+    ``imblearn.pipeline.Pipeline`` and resample only the training folds of a search.
+    """
+
+    def __init__(self, strategy="smote", neighbors="exact", k_neighbors=5, n_jobs=-1, n_partitions=None, random_state=42):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown resampling strategy {strategy}, expected one of {STRATEGIES}")
+        if neighbors not in NEIGHBOR_SEARCHES:
+            raise ValueError(f"Unknown neighbour search {neighbors}, expected one of {NEIGHBOR_SEARCHES}")
+
+        self.strategy = strategy
+        self.neighbors = neighbors
+        self.k_neighbors = k_neighbors
+        self.n_jobs = n_jobs
+        self.n_partitions = n_partitions
+        self.random_state = random_state
+        self.stats = {}
+
+    def class_weights(self, y):
+        """
+        Explicit balanced class weights for the estimator when weighting replaces resampling.
+
+        The weights are computed once from the full training labels rather than passing
+        "balanced", so warm-started forests grown on subsets keep consistent weights.
+        """
+        if self.strategy != "class_weight":
+            return None
+        classes = np.unique(y)
+        weights = compute_class_weight("balanced", classes=classes, y=y)
+        return {label.item(): float(weight) for label, weight in zip(classes, weights)}
+
+    def partitioned_fit_resample(self, X, y):
+        n_partitions = self.n_partitions or effective_n_jobs(self.n_jobs)
+        rng = np.random.RandomState(self.random_state)
+        # Deal each class out round-robin over shuffled partitions, so every partition keeps the class ratio.
+        assignment = np.empty(len(y), dtype=np.int64)
+        for label in np.unique(y):
+            rows = np.flatnonzero(y.to_numpy() == label)
+            assignment[rng.permutation(rows)] = np.arange(len(rows)) % n_partitions
+
+        parts = Parallel(n_jobs=self.n_jobs)(
+            delayed(_smote_partition)(X.iloc[assignment == part], y.iloc[assignment == part],
+                                      self.k_neighbors, self.random_state + part)
+            for part in range(n_partitions)
+        )
+        X_resampled = pd.concat([part[0] for part in parts], ignore_index=True)
+        y_resampled = pd.concat([part[1] for part in parts], ignore_index=True)
+        return X_resampled, y_resampled
+
+    def fit_resample(self, X, y):
+        """
+        Resample ``X``/``y`` according to the configured strategy.
+
+        Runtime, row counts and memory are recorded in ``self.stats``.
+
+        Returns:
+            tuple: Resampled ``(X, y)``; the inputs themselves when not oversampling.
+        """
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        start = time.perf_counter()
+
+        if self.strategy != "smote":
+            X_resampled, y_resampled = X, y
+        elif self.neighbors == "partitioned":
+            X_resampled, y_resampled = self.partitioned_fit_resample(X, y)
+        else:
+            X_resampled, y_resampled = _smote_partition(X, y, self.k_neighbors, self.random_state, n_jobs=self.n_jobs)
+
+        self.stats = {
+            'strategy': self.strategy,
+            'neighbors': self.neighbors if self.strategy == "smote" else None,
+            'seconds': round(time.perf_counter() - start, 3),
+            'rows_in': len(X),
+            'rows_out': len(X_resampled),
+            'class_counts': {str(label): int(count) for label, count in pd.Series(y_resampled).value_counts().items()},
+            'output_mb': round(float(X_resampled.memory_usage(deep=True).sum()) / 1e6, 3),
+            'rss_delta_mb': round((process.memory_info().rss - rss_before) / 1e6, 3)
+        }
+        logger.info(f"Resampling stats: {self.stats}")
+        return X_resampled, y_resampled
@@ -0,0 +1,90 @@
+"""
+Shadow Scoring Module
+
+Scores a candidate model next to the serving model on sampled live traffic, without
+affecting responses. Sampled requests are handed to a small background executor
+after the primary prediction is made; the shadow prediction is compared with the
+primary one and recorded as Prometheus metrics (agreement, probability delta and
+latency relative to the primary model). At most ``max_pending`` requests wait for
+or run in the executor; beyond that, shadow work is dropped instead of queued.
+"""
+
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from prometheus_client import Counter, Histogram
+from src.logger import get_logger
+from config.feature_config import FEATURE_COLUMNS
+
+logger = get_logger(__name__)
+
+shadow_predictions = Counter('shadow_predictions_total', 'Shadow predictions by agreement with the primary model',
+                             ['shadow_version', 'agreement'])
+shadow_dropped = Counter('shadow_dropped_total', 'Sampled requests dropped because the shadow queue was full',
+                         ['shadow_version'])
+shadow_errors = Counter('shadow_errors_total', 'Shadow predictions that raised', ['shadow_version'])
+shadow_probability_delta = Histogram('shadow_probability_delta', 'Absolute survival probability difference, shadow vs primary',
+                                     ['shadow_version'], buckets=(0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0))
+shadow_latency_ratio = Histogram('shadow_latency_ratio', 'Shadow scoring latency relative to the primary model',
+                                 ['shadow_version'], buckets=(0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 3.0, 5.0, 10.0))
+
+
+class ShadowScorer:
+
+    def __init__(self, model, model_version, sample_rate=0.1, workers=1, max_pending=64):
+        self.model = model
+        self.model_version = model_version
+        self.sample_rate = sample_rate
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shadow-scoring")
+        # Held from submission until the shadow prediction is recorded.
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, features, primary_probability, primary_seconds):
+        """
+        Shadow-score a sampled request in the background. Never blocks.
+
+        Args:
+            features (pd.DataFrame or dict): One-row model input, or a feature dict.
+            primary_probability (float): Survival probability returned by the primary model.
+            primary_seconds (float): Time the primary model took to score the request.
+
+        Returns:
+            bool: Whether the request was handed to the shadow executor.
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        if not self.slots.acquire(blocking=False):
+            shadow_dropped.labels(shadow_version=self.model_version).inc()
+            return False
+        try:
+            self.executor.submit(self._score, features, primary_probability, primary_seconds)
+        except RuntimeError:
+            # Executor shut down during interpreter exit.
+            self.slots.release()
+            return False
+        return True
+
+    def _score(self, features, primary_probability, primary_seconds):
+        try:
+            if isinstance(features, dict):
+                features = pd.DataFrame([features])[FEATURE_COLUMNS]
+            start = time.perf_counter()
+            probability = float(self.model.predict_proba(features)[0, 1])
+            shadow_seconds = time.perf_counter() - start
+
+            agreement = "agree" if (probability > 0.5) == (primary_probability > 0.5) else "disagree"
+            shadow_predictions.labels(shadow_version=self.model_version, agreement=agreement).inc()
+            shadow_probability_delta.labels(shadow_version=self.model_version).observe(abs(probability - primary_probability))
+            if primary_seconds > 0:
+                shadow_latency_ratio.labels(shadow_version=self.model_version).observe(shadow_seconds / primary_seconds)
+
+        except Exception as e:
+            shadow_errors.labels(shadow_version=self.model_version).inc()
+            logger.error(f"Shadow model {self.model_version} failed to score a request: {e}")
+        finally:
+            self.slots.release()
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,138 @@
+"""
+Tracing Module
+
+OpenTelemetry tracing shared by the serving app and the training pipeline. Entry points
+call ``configure_tracing`` once; components mark their work with the ``traced``
+decorator or the ``span`` context manager. Until tracing is configured (or when the
+exporter is "none") both reduce to a flag check, so instrumented code pays nothing.
+OpenTelemetry itself is only imported once tracing is enabled.
+"""
+
+import os
+import functools
+import threading
+from contextlib import nullcontext
+from src.logger import get_logger
+from config.tracing_config import TRACING_CONFIG
+
+logger = get_logger(__name__)
+
+_enabled = False
+_lock = threading.Lock()
+# The opentelemetry.trace module, imported by configure_tracing.
+_trace = None
+
+
+def _build_exporter(config):
+    exporter = config['exporter']
+    if exporter == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        return ConsoleSpanExporter()
+    if exporter == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        directory = os.path.dirname(config['file_path'])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return ConsoleSpanExporter(out=open(config['file_path'], 'a'),
+                                   formatter=lambda span: span.to_json(indent=None) + os.linesep)
+    if exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    raise ValueError(f"Unknown tracing exporter {exporter}, expected 'none', 'console', 'file' or 'otlp'")
+
+
+def configure_tracing(service_name=None, config=TRACING_CONFIG):
+    """
+    Install a tracer provider with a parent-based ratio sampler and a batching exporter.
+    Safe to call more than once; later calls are ignored.
+
+    Returns:
+        bool: Whether tracing is enabled.
+    """
+    global _enabled, _trace
+    with _lock:
+        if _enabled or config['exporter'] == "none":
+            return _enabled
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name or config['service_name']}),
+            sampler=ParentBased(TraceIdRatioBased(config['sample_ratio']))
+        )
+        provider.add_span_processor(BatchSpanProcessor(_build_exporter(config)))
+        trace.set_tracer_provider(provider)
+        _trace = trace
+        _enabled = True
+    logger.info(f"Tracing enabled for {service_name or config['service_name']} with the {config['exporter']} "
+                f"exporter, sampling {config['sample_ratio']:.0%} of traces")
+    return True
+
+
+def tracing_enabled():
+    return _enabled
+
+
+def span(name, attributes=None):
+    """Context manager running its block in a child span of the current one."""
+    if not _enabled:
+        return nullcontext()
+    return _trace.get_tracer(__name__).start_as_current_span(name, attributes=attributes)
+
+
+def traced(name=None, attributes=None):
+    """Decorator running the function in a span named ``name`` (default: its qualified name)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _trace.get_tracer(func.__module__).start_as_current_span(span_name, attributes=attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_span_attributes(attributes):
+    """Add attributes to the current span, e.g. outcomes only known inside the block."""
+    if _enabled:
+        _trace.get_current_span().set_attributes(attributes)
+
+
+def start_server_span(name, carrier=None, attributes=None):
+    """
+    Start a server span and make it current, continuing the W3C trace context found in
+    ``carrier`` (e.g. request headers) so a caller's trace spans both processes.
+
+    Returns:
+        The handle to pass to ``end_server_span``, or None when tracing is disabled.
+    """
+    if not _enabled:
+        return None
+    from opentelemetry import context, propagate
+    from opentelemetry.trace import SpanKind
+    parent = propagate.extract(carrier) if carrier is not None else None
+    server_span = _trace.get_tracer(__name__).start_span(name, context=parent, kind=SpanKind.SERVER,
+                                                        attributes=attributes)
+    token = context.attach(_trace.set_span_in_context(server_span, parent))
+    return server_span, token
+
+
+def end_server_span(handle, status_code=None, error=None):
+    from opentelemetry import context
+    from opentelemetry.trace import Status, StatusCode
+    server_span, token = handle
+    if status_code is not None:
+        server_span.set_attribute("http.response.status_code", status_code)
+        if status_code >= 500:
+            server_span.set_status(Status(StatusCode.ERROR))
+    if error is not None:
+        server_span.record_exception(error)
+        server_span.set_status(Status(StatusCode.ERROR, str(error)))
+    server_span.end()
+    context.detach(token)
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+from datetime import datetime
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+
+def serialize_watermark(value):
+    """JSON-serialisable form of a watermark value (numpy scalar, timestamp or plain value)."""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+class WatermarkStore:
+    """
+    Persists the high-water mark of the last successfully processed ingestion run.
+
+    The mark is stored as JSON together with the column it refers to, so changing
+    the watermark column forces a full reload instead of comparing unrelated values.
+    """
+
+    def __init__(self, path, column):
+        self.path = path
+        self.column = column
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def load(self):
+        try:
+            if not os.path.exists(self.path):
+                return None
+            with open(self.path) as file:
+                state = json.load(file)
+            if state.get("column") != self.column:
+                logger.warning(f"Stored watermark refers to column {state.get('column')}, not {self.column}. Ignoring it.")
+                return None
+            return state.get("value")
+
+        except Exception as e:
+            logger.error(f"Error while loading watermark: {e}")
+            raise CustomException(str(e), sys)
+
+    def save(self, value):
+        try:
+            value = serialize_watermark(value)
+
+            state = {"column": self.column, "value": value, "updated_at": datetime.now().isoformat()}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(state, file)
+            os.replace(tmp_path, self.path)
+            logger.info(f"Watermark advanced to {self.column}={value}")
+
+        except Exception as e:
+            logger.error(f"Error while saving watermark: {e}")
+            raise CustomException(str(e), sys)
@@ -0,0 +1,90 @@
+"""Tests for the bulk COPY loader used by the extract_data_from_gcp DAG. They run against a fake connection, no Postgres needed."""
+
+import pytest
+from include.postgres_loader import bulk_load_csv, build_load_statements
+
+
+class FakeCursor:
+    def __init__(self, fail_on=None):
+        self.statements = []
+        self.copied = b""
+        self.rowcount = -1
+        self.fail_on = fail_on
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement):
+        if self.fail_on and self.fail_on in statement:
+            raise RuntimeError(f"failed on {statement}")
+        self.statements.append(statement)
+
+    def copy_expert(self, statement, file, size):
+        self.statements.append(statement)
+        chunks = iter(lambda: file.read(size), "")
+        data = "".join(chunks)
+        self.copied = data
+        self.rowcount = data.count("\n") - 1
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+        self.rolled_back = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "titanic.csv"
+    path.write_text(
+        "PassengerId,Survived,Pclass,Name,Sex,Age,SibSp,Parch,Ticket,Fare,Cabin,Embarked\n"
+        '1,0,3,"Braund, Mr. Owen Harris",male,22,1,0,A/5 21171,7.25,,S\n'
+        '2,1,1,"Cumings, Mrs. John Bradley",female,38,1,0,PC 17599,71.2833,C85,C\n'
+    )
+    return str(path)
+
+
+def test_copy_runs_into_staging_then_swaps(csv_file):
+    cursor = FakeCursor()
+    conn = FakeConnection(cursor)
+
+    rows = bulk_load_csv(conn, csv_file, chunk_size=16)
+
+    assert rows == 2
+    assert conn.committed and not conn.rolled_back
+    copy_index = next(i for i, s in enumerate(cursor.statements) if s.startswith("COPY"))
+    assert '"titanic_staging"' in cursor.statements[copy_index]
+    assert all("RENAME" not in s for s in cursor.statements[:copy_index])
+    assert cursor.statements[-2] == 'ALTER TABLE "public"."titanic_staging" RENAME TO "titanic"'
+    assert "Braund" in cursor.copied
+
+
+def test_failure_rolls_back_without_touching_live_table(csv_file):
+    cursor = FakeCursor(fail_on="ANALYZE")
+    conn = FakeConnection(cursor)
+
+    with pytest.raises(RuntimeError):
+        bulk_load_csv(conn, csv_file)
+
+    assert conn.rolled_back and not conn.committed
+    assert all("RENAME" not in s for s in cursor.statements)
+
+
+def test_staging_table_uses_declared_types_and_csv_column_order():
+    statements = build_load_statements("titanic", ["Name", "Age", "Extra"], {"Name": "TEXT", "Age": "DOUBLE PRECISION"})
+
+    assert statements["prepare"][1] == 'CREATE TABLE "public"."titanic_staging" ("Name" TEXT, "Age" DOUBLE PRECISION, "Extra" TEXT)'
+    assert '("Name", "Age", "Extra")' in statements["copy"]
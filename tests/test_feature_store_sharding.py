@@ -0,0 +1,83 @@
+"""Tests for the sharded Redis feature store. They run against fakeredis clients, no Redis needed."""
+
+import pytest
+from src.feature_store import FeatureStore, LIVE_SNAPSHOT_KEY, SNAPSHOT_REGISTRY_KEY
+
+fakeredis = pytest.importorskip("fakeredis")
+
+NODES = ("redis-a:6379", "redis-b:6379", "redis-c:6379")
+
+
+def fake_client():
+    # Every client gets its own server, so each node has a separate keyspace.
+    return fakeredis.FakeStrictRedis(server=fakeredis.FakeServer(), decode_responses=True)
+
+
+def make_store(nodes=NODES, **kwargs):
+    return FeatureStore(clients={node: fake_client() for node in nodes}, write_batch_size=16, **kwargs)
+
+
+def features(entity_id):
+    return {"Age": float(entity_id), "Fare": 7.25, "Survived": entity_id % 2}
+
+
+def entity_keys(client):
+    return set(client.scan_iter("snapshot:*")) | set(client.scan_iter("entity:*"))
+
+
+@pytest.fixture
+def batch():
+    return {str(entity_id): features(entity_id) for entity_id in range(200)}
+
+
+def test_entities_are_written_to_and_read_from_their_owning_node(batch):
+    store = make_store()
+    store.load_snapshot(batch, background_gc=False)
+
+    snapshot = store.live_snapshot()
+    for node, client in store.shards.items():
+        owned = {store.entity_key(entity_id, snapshot) for entity_id in batch if store.ring.get_node(entity_id) == node}
+        assert owned, f"no entities hashed to {node}"
+        assert entity_keys(client) == owned
+    assert store.get_batch_features(list(batch) + ["missing"]) == {**batch, "missing": None}
+    assert store.get_features("42") == batch["42"]
+
+
+def test_adding_and_removing_a_node_moves_only_reowned_keys(batch):
+    store = make_store()
+    store.load_snapshot(batch, background_gc=False)
+    owners = {entity_id: store.ring.get_node(entity_id) for entity_id in batch}
+
+    moved = store.add_node("redis-d:6379", client=fake_client())
+
+    reowned = {entity_id for entity_id in batch if store.ring.get_node(entity_id) != owners[entity_id]}
+    assert moved == len(reowned) > 0
+    assert all(store.ring.get_node(entity_id) == "redis-d:6379" for entity_id in reowned)
+    assert len(entity_keys(store.shards["redis-d:6379"])) == len(reowned)
+    assert store.get_batch_features(batch) == batch
+
+    moved = store.remove_node("redis-d:6379")
+
+    assert moved == len(reowned)
+    assert "redis-d:6379" not in store.shards
+    assert {entity_id: store.ring.get_node(entity_id) for entity_id in batch} == owners
+    assert store.get_batch_features(batch) == batch
+    assert sum(len(entity_keys(client)) for client in store.shards.values()) == len(batch)
+
+
+def test_snapshot_pointer_and_gc_stay_on_the_metadata_node(batch):
+    store = make_store(keep_snapshots=2)
+    versions = [store.load_snapshot(batch, background_gc=False) for _ in range(3)]
+    store.add_node("redis-d:6379", client=fake_client())
+
+    metadata = store.shards[store.metadata_node]
+    assert metadata.get(LIVE_SNAPSHOT_KEY) == versions[-1]
+    assert metadata.zrange(SNAPSHOT_REGISTRY_KEY, 0, -1) == versions[1:]
+    for node, client in store.shards.items():
+        if node != store.metadata_node:
+            assert not client.exists(LIVE_SNAPSHOT_KEY, SNAPSHOT_REGISTRY_KEY)
+        assert not list(client.scan_iter(f"snapshot:{versions[0]}:*"))
+    assert store.get_batch_features(batch) == batch
+
+    with pytest.raises(ValueError):
+        store.remove_node(store.metadata_node)
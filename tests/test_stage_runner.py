@@ -0,0 +1,89 @@
+"""Tests for the cached stage runner of the training pipeline. They run on a manifest under tmp_path."""
+
+import pytest
+from pipeline.stage_runner import StageRunner
+from src.watermark import WatermarkStore
+
+
+class CountingStage:
+    def __init__(self, output_path, result=None):
+        self.output_path = output_path
+        self.result = result if result is not None else {"rows": 2}
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.output_path.write_text(f"run {self.calls}")
+        return self.result
+
+
+@pytest.fixture
+def manifest_path(tmp_path):
+    return str(tmp_path / "stages" / "manifest.json")
+
+
+def run(manifest_path, stage, inputs, force=False):
+    runner = StageRunner(manifest_path, force=force)
+    result = runner.run_stage("stage", stage, inputs=inputs, outputs=[str(stage.output_path)])
+    return result, runner.report[-1]["status"]
+
+
+def test_stage_is_skipped_when_inputs_and_outputs_are_unchanged(manifest_path, tmp_path):
+    stage = CountingStage(tmp_path / "out.txt")
+
+    assert run(manifest_path, stage, {"source": "a"}) == ({"rows": 2}, "ran")
+    assert run(manifest_path, stage, {"source": "a"}) == ({"rows": 2}, "skipped")
+    assert stage.calls == 1
+
+    assert run(manifest_path, stage, {"source": "b"})[1] == "ran"
+    assert stage.calls == 2
+
+
+@pytest.mark.parametrize("change", ["modify", "delete"])
+def test_stage_reruns_when_an_output_changes(manifest_path, tmp_path, change):
+    stage = CountingStage(tmp_path / "out.txt")
+    run(manifest_path, stage, {"source": "a"})
+
+    if change == "modify":
+        stage.output_path.write_text("edited by hand")
+    else:
+        stage.output_path.unlink()
+
+    assert run(manifest_path, stage, {"source": "a"})[1] == "ran"
+    assert stage.calls == 2
+    assert run(manifest_path, stage, {"source": "a"})[1] == "skipped"
+
+
+def test_force_reruns_an_up_to_date_stage(manifest_path, tmp_path):
+    stage = CountingStage(tmp_path / "out.txt")
+    run(manifest_path, stage, {"source": "a"})
+
+    assert run(manifest_path, stage, {"source": "a"}, force=True)[1] == "ran"
+    assert stage.calls == 2
+
+
+def test_watermark_is_committed_from_a_cached_ingestion_result(manifest_path, tmp_path):
+    data_ingestion = pytest.importorskip("src.data_ingestion")
+    store = WatermarkStore(str(tmp_path / "watermark.json"), "PassengerId")
+    ingestion = data_ingestion.DataIngestion({}, str(tmp_path / "raw"), watermark_store=store)
+
+    def ingest():
+        (tmp_path / "delta.csv").write_text("PassengerId\n891\n")
+        ingestion.rows_extracted, ingestion.is_delta, ingestion.pending_watermark = 1, True, 891
+        return {"rows_extracted": 1, "is_delta": True, "pending_watermark": ingestion.pending_watermark}
+
+    def ingestion_stage():
+        runner = StageRunner(manifest_path)
+        return runner.run_stage("data_ingestion", ingest, inputs={"watermark": store.load()},
+                                outputs=[str(tmp_path / "delta.csv")])
+
+    # Processing fails after the delta was ingested: the watermark must not move.
+    ingestion_stage()
+    assert store.load() is None
+
+    # The retry reuses the cached ingestion, so only its recorded result knows the mark.
+    ingestion = data_ingestion.DataIngestion({}, str(tmp_path / "raw"), watermark_store=store)
+    result = ingestion_stage()
+    assert ingestion.pending_watermark is None
+    ingestion.commit_watermark(result["pending_watermark"])
+    assert store.load() == 891